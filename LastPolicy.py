@@ -1,166 +1,113 @@
 import numpy as np
 import time
 
-
-# ---------------------------------
-# Nodo ligero para el árbol de MCTS
-# ---------------------------------
-class Node:
-    __slots__ = (
-        "board", "player", "untried", "children",
-        "parent", "W", "N", "Q"
-    )
-
-    def __init__(self, board, player, untried, parent=None):
-        self.board = board
-        self.player = player
-        self.untried = list(untried)
-        self.children = {}
-        self.parent = parent
-        self.W = 0.0
-        self.N = 0
-        self.Q = 0.0
+from bitboard import BitBoard
+from nodepool import NodePool
+from time_manager import TimeManager
 
 
 class MonteCarloTreeSearchConnectFour:
+    """
+    MCTS sobre un NodePool: cada nodo es un índice en arrays preasignados y
+    su tablero se reconstruye jugando el camino desde la raíz.
+    """
 
-    def __init__(self, s0: np.ndarray, main_player: int, rng: np.random.RandomState):
+    def __init__(self, s0: BitBoard, main_player: int, rng: np.random.RandomState,
+                 capacity: int = 200_000):
         self.s0 = s0
         self.main_player = main_player
         self.rng = rng
         self.c = 1.3
 
-        self.root_node = Node(
-            board=s0.copy(),
-            player=main_player,
-            untried=self.legal_actions(s0),
-            parent=None
-        )
+        self.pool = NodePool(capacity)
+        self.set_root(s0, main_player)
 
     # ------------- utilidades del tablero -------------
-    def legal_actions(self, s: np.ndarray):
-        return [c for c in range(s.shape[1]) if s[0, c] == 0]
-
-    def drop_piece_inplace(self, board: np.ndarray, col: int, player: int):
-        for r in range(board.shape[0] - 1, -1, -1):
-            if board[r, col] == 0:
-                board[r, col] = player
-                return r
-        return -1
-
-    def check_win_from(self, board, row, col, player):
-        if row < 0:
-            return False
-
-        rows, cols = board.shape
-        dirs = [(0, 1), (1, 0), (1, 1), (1, -1)]
-
-        for dr, dc in dirs:
-            count = 1
-            r, c = row + dr, col + dc
-            while 0 <= r < rows and 0 <= c < cols and board[r, c] == player:
-                count += 1
-                r += dr
-                c += dc
-
-            r, c = row - dr, col - dc
-            while 0 <= r < rows and 0 <= c < cols and board[r, c] == player:
-                count += 1
-                r -= dr
-                c -= dc
-
-            if count >= 4:
-                return True
-        return False
-
-    def is_winning_move(self, board, col, player):
-        """
-        Comprueba si jugar en `col` hace ganar al jugador `player`.
-        Modifica y revierte el tablero internamente.
-        """
-        row = -1
-        for r in range(board.shape[0] - 1, -1, -1):
-            if board[r, col] == 0:
-                row = r
-                break
-        if row == -1:
-            return False
-
-        board[row, col] = player
-        win = self.check_win_from(board, row, col, player)
-        board[row, col] = 0
-        return win
+    def legal_actions(self, board: BitBoard):
+        return board.legal_actions()
 
     # ---------------------- ROOT ----------------------
-    def set_root(self, board: np.ndarray, player: int):
-        self.root_node = Node(
-            board=board.copy(),
-            player=player,
-            untried=self.legal_actions(board),
-            parent=None
-        )
+    def set_root(self, board: BitBoard, player: int):
+        # el pool se vacía, no se vuelve a reservar
+        self.root_board = board.copy()
+        self.root = self.pool.reset(board, player)
+
+    def root_children(self):
+        """return: lista de (acción, N, Q) de los hijos de la raíz."""
+        pool = self.pool
+        return [
+            (int(pool.move[ch]), int(pool.N[ch]),
+             float(pool.W[ch] / pool.N[ch]) if pool.N[ch] else 0.0)
+            for ch in pool.children(self.root)
+        ]
 
     # ---------------------- MCTS ----------------------
     def run(self, time_limit=0.05):
         start = time.time()
         while time.time() - start < time_limit:
-            node_s = self.select()
-            node_s, node_s_next = self.expand(node_s)
-            leaf, winner = self.simulate(node_s_next)
+            node_s, board = self.select()
+            node_s, node_s_next = self.expand(node_s, board)
+            leaf, winner = self.simulate(node_s_next, board)
             self.backpropagate(leaf, winner)
 
     def select(self):
-        node = self.root_node
+        pool = self.pool
+        node = self.root
+        board = self.root_board.copy()
         while True:
-            if node.untried:
-                return node
-            if not node.children:
-                return node
+            if pool.untried[node]:
+                return node, board
+            if pool.first_child[node] < 0:
+                return node, board
 
-            children = list(node.children.values())
+            children = list(pool.children(node))
             for child in children:
-                if child.N == 0:
-                    return child
+                if pool.N[child] == 0:
+                    board.play(int(pool.move[child]), int(pool.player[node]))
+                    return child, board
 
-            parent_log = np.log(max(1, node.N))
+            parent_log = np.log(max(1, pool.N[node]))
             scores = [
-                child.Q + self.c * np.sqrt(parent_log / child.N)
+                pool.W[child] / pool.N[child]
+                + self.c * np.sqrt(parent_log / pool.N[child])
                 for child in children
             ]
-            node = children[np.argmax(scores)]
-
-    def expand(self, node):
-        if not node.untried:
+            child = children[np.argmax(scores)]
+            board.play(int(pool.move[child]), int(pool.player[node]))
+            node = child
+
+    def expand(self, node, board):
+        pool = self.pool
+        untried = pool.untried_actions(node)
+        if not untried:
             return node, node
 
-        a = int(self.rng.choice(node.untried))
-        node.untried.remove(a)
+        a = int(self.rng.choice(untried))
+        player = int(pool.player[node])
+        board.play(a, player)
 
-        new_board = node.board.copy()
-        self.drop_piece_inplace(new_board, a, node.player)
+        new_node = pool.alloc(node, a, board, -player)
+        if new_node < 0:
+            # pool lleno: se simula desde el propio nodo
+            board.undo(a, player)
+            return node, node
 
-        new_node = Node(
-            board=new_board,
-            player=-node.player,
-            untried=self.legal_actions(new_board),
-            parent=node
-        )
-        node.children[a] = new_node
+        pool.untried[node] &= ~np.uint8(1 << a)
         return node, new_node
 
-    def simulate(self, node):
-        board = node.board.copy()
-        player = node.player
+    def simulate(self, node, board):
+        board = board.copy()
+        player = int(self.pool.player[node])
 
         while True:
-            actions = self.legal_actions(board)
+            actions = board.legal_actions()
             if not actions:
                 return node, 0
 
             # 1) ganar si se puede
             chosen = None
             for a in actions:
-                if self.is_winning_move(board, a, player):
+                if board.is_winning_move(a, player):
                     chosen = a
                     break
 
@@ -168,7 +115,7 @@ class MonteCarloTreeSearchConnectFour:
                 # 2) bloquear al rival si gana
                 opp = -player
                 for a in actions:
-                    if self.is_winning_move(board, a, opp):
+                    if board.is_winning_move(a, opp):
                         chosen = a
                         break
 
@@ -179,29 +126,28 @@ class MonteCarloTreeSearchConnectFour:
                 else:
                     chosen = int(self.rng.choice(actions))
 
-            col = chosen
-            row = self.drop_piece_inplace(board, col, player)
+            board.play(chosen, player)
 
-            if self.check_win_from(board, row, col, player):
+            if board.has_won(player):
                 return node, player
 
-            if np.all(board[0] != 0):
+            if board.is_full():
                 return node, 0
 
             player = -player
 
     def backpropagate(self, leaf, winner):
+        pool = self.pool
+        reward = (
+            1.0 if winner == self.main_player else
+            -1.0 if winner != 0 else
+            0.0
+        )
         node = leaf
-        while node is not None:
-            node.N += 1
-            reward = (
-                1.0 if winner == self.main_player else
-                -1.0 if winner != 0 else
-                0.0
-            )
-            node.W += reward
-            node.Q = node.W / node.N
-            node = node.parent
+        while node >= 0:
+            pool.N[node] += 1
+            pool.W[node] += reward
+            node = int(pool.parent[node])
 
 
 # ===============================
@@ -209,9 +155,12 @@ class MonteCarloTreeSearchConnectFour:
 # ===============================
 class MyLastPolicy:
 
-    def __init__(self):
+    def __init__(self, clock=None):
+        # reparto del tiempo de búsqueda (por defecto 50 ms por jugada)
+        self.clock = clock if clock is not None else TimeManager()
+
         # asegurar que el autograder no falle aunque no llame mount()
-        init_state = np.zeros((6, 7), dtype=int)
+        init_state = BitBoard()
         rng = np.random.RandomState(42)
 
         self.mcts = MonteCarloTreeSearchConnectFour(
@@ -221,8 +170,9 @@ class MyLastPolicy:
         )
 
     def mount(self, *args, **kwargs):
-        init_state = np.zeros((6, 7), dtype=int)
+        init_state = BitBoard()
         rng = np.random.RandomState(42)
+        self.clock.start_game()
 
         self.mcts = MonteCarloTreeSearchConnectFour(
             s0=init_state,
@@ -237,8 +187,16 @@ class MyLastPolicy:
         return 1 if ones == negs else -1
 
     def act(self, s: np.ndarray) -> int:
+        start = time.monotonic()
+        try:
+            return self.choose(s)
+        finally:
+            self.clock.spend(time.monotonic() - start)
+
+    def choose(self, s: np.ndarray) -> int:
         player = self.infer_player(s)
-        legal = self.mcts.legal_actions(s)
+        board = BitBoard.from_array(s)
+        legal = board.legal_actions()
 
         # seguridad: si por alguna razón no hay jugadas legales
         if not legal:
@@ -246,32 +204,38 @@ class MyLastPolicy:
 
         # ===== 1) Jugada ganadora inmediata =====
         for a in legal:
-            if self.mcts.is_winning_move(s, a, player):
+            if board.is_winning_move(a, player):
                 return a
 
         # ===== 2) Bloquear jugada ganadora inmediata del rival =====
         opp = -player
         for a in legal:
-            if self.mcts.is_winning_move(s, a, opp):
+            if board.is_winning_move(a, opp):
                 return a
 
         # ===== 3) Heurísticas de centro (apertura y control) =====
         # Tablero vacío → jugar centro
-        if np.all(s == 0) and 3 in legal:
+        if board.moves == 0 and 3 in legal:
             return 3
         # Si soy el jugador 1 y el centro está libre, me conviene
-        if player == 1 and 3 in legal and s[0, 3] == 0:
+        if player == 1 and 3 in legal:
             return 3
 
         # ===== 4) MCTS para el resto de decisiones =====
-        self.mcts.set_root(s, player)
-        self.mcts.run(time_limit=0.05)
+        self.mcts.set_root(board, player)
+        base = self.clock.allocate(board)
+        self.mcts.run(time_limit=base)
 
-        root = self.mcts.root_node
+        children = self.mcts.root_children()
+        extra = self.clock.extension([n for _, n, _ in children],
+                                     [q for _, _, q in children], base)
+        if extra > 0:
+            self.mcts.run(time_limit=extra)
+            children = self.mcts.root_children()
 
         # fallback: si no se exploró nada, jugar random legal
-        if not root.children:
+        if not children:
             return int(self.mcts.rng.choice(legal))
 
-        best_a = max(root.children, key=lambda a: root.children[a].N)
+        best_a, _, _ = max(children, key=lambda c: c[1])
         return int(best_a)
\ No newline at end of file
@@ -1,268 +1,788 @@
+import math
 import numpy as np
-import time
 import os
-import json
-
-
-class Node:
-    __slots__ = ("board", "player", "untried", "children",
-                 "parent", "W", "N", "Q")
+import threading
+import time
 
-    def __init__(self, board, player, untried, parent=None):
-        self.board = board
-        self.player = player
-        self.untried = list(untried)
-        self.children = {}
-        self.parent = parent
-        self.W = 0.0
-        self.N = 0
-        self.Q = 0.0
+from bitboard import CELLS, CENTER_ORDER, COLS, BitBoard, canonical_edge
+from book import OpeningBook
+from nodepool import UNSOLVED, NodePool, TranspositionTable
+from qstore import open_store
+from rollout import simulate_batch, simulate_one
+from root_parallel import RootParallelSearch
+from seeding import random_state, sequence
+from solver import Solver
+from time_manager import TimeManager
+from tree_parallel import TreeParallelSearch
+
+
+# Con pocas casillas libres se resuelve la posición en vez de simularla:
+# en act() con un presupuesto de tiempo y, dentro del árbol, al expandir un
+# nodo con un presupuesto pequeño de nodos.
+SOLVER_EMPTY = 16
+SOLVER_TIME = 0.02
+SOLVER_NODES = 2500  # lo que suele dar SOLVER_TIME, para búsquedas sin reloj
+EXPAND_SOLVER_EMPTY = 12
+EXPAND_SOLVER_NODES = 2000
+
+# cada cuántas iteraciones se comprueba si la mejor jugada ya está decidida
+EARLY_STOP_EVERY = 8
+
+# máximo de segundos que se sigue buscando durante el turno del rival
+PONDER_MAX = 10.0
+
+# al avanzar la raíz se reutiliza el subárbol solo si el pool está como mucho
+# a esta fracción de su capacidad; si no, se vacía
+REUSE_LIMIT = 0.5
+
+
+def principal_variation(pool, i):
+    """
+    Jugadas más visitadas desde el nodo `i`. Las visitas de una posición
+    se reparten entre los nodos que la comparten, así que si el elegido no
+    tiene hijos se sigue por otro de ellos que sí los tenga (reflejando las
+    jugadas si está en la orientación contraria).
+    """
+    N, stat = pool.N, pool.stat
+    pv = []
+    mirrored = False
+    while True:
+        if pool.first_child[i] < 0:
+            used = len(pool)
+            others = np.flatnonzero((stat[:used] == stat[i])
+                                    & (pool.first_child[:used] >= 0))
+            if not len(others):
+                break
+            other = int(others[0])
+            if pool.board(other).key != pool.board(i).key:
+                mirrored = not mirrored
+            i = other
+        best = max(pool.children(i), key=lambda ch: N[stat[ch]])
+        if N[stat[best]] == 0:
+            break
+        move = int(pool.move[best])
+        pv.append(COLS - 1 - move if mirrored else move)
+        i = best
+    return pv
+
+
+class SearchResult:
+    """
+    Resultado de MonteCarloTreeSearchConnectFour.search(). Las acciones
+    están en la orientación de la raíz del árbol.
+    """
+
+    def __init__(self, stats, pv, solved, iterations, nodes, elapsed, reason):
+        self.visits = {a: n for a, (n, w) in stats.items()}
+        # valor de cada jugada para el jugador al turno en la raíz
+        self.values = {a: -w / n if n else 0.0 for a, (n, w) in stats.items()}
+        self.pv = pv
+        self.solved = solved
+        self.iterations = iterations
+        self.nodes = nodes
+        self.elapsed = elapsed
+        self.rate = iterations / elapsed if elapsed > 0 else 0.0
+        # "time", "iterations", "nodes", "early" o "solved"
+        self.reason = reason
+
+    def __repr__(self):
+        return (f"SearchResult(pv={self.pv}, iterations={self.iterations}, "
+                f"nodes={self.nodes}, rate={self.rate:.0f}/s, "
+                f"reason={self.reason!r})")
 
 
 class MonteCarloTreeSearchConnectFour:
-
-    def __init__(self, s0, main_player, rng, Q_global, N_global):
+    """
+    MCTS sobre un NodePool: los nodos son índices en arrays preasignados
+    (N, W, padre, primer hijo, jugada, clave de la posición...) y el tablero
+    de cada nodo no se guarda, se reconstruye jugando el camino desde la
+    raíz durante la selección. W[i] es la suma de recompensas desde el punto
+    de vista del jugador al turno en i.
+
+    Dentro del árbol, las posiciones a las que se llega por distintos órdenes
+    de jugadas (o su reflejo) comparten N, W y resultado demostrado: la
+    tabla de transposición (clave canónica -> nodo) da al expandir el nodo
+    que ya tenía la posición, y el nuevo apunta a él con pool.stat. Cada
+    nodo conserva sus propios hijos, así que el tablero se sigue
+    reconstruyendo jugando el camino. Entre búsquedas las transposiciones
+    se aprovechan a través de las tablas Q/N globales de `store`, indexadas
+    por (posición canónica, acción). Cada nodo guarda al
+    crearse la clave de la arista que lleva a él (pool.edge), así que la
+    retropropagación es un recorrido del camino sin recalcular claves y sus
+    actualizaciones globales se aplican en bloque con store.update().
+
+    Al expandir un nodo se copia también lo que las tablas globales sabían
+    de su arista (prior_w, prior_n). Como desde entonces todo lo que se
+    suma a esa arista pasa por el propio nodo, las estadísticas globales
+    son prior + N/W locales y la selección no consulta las tablas.
+
+    La selección baja por UCB hasta un nodo con jugadas por expandir o una
+    hoja. Sin `widening` un nodo se expande entero antes de bajar por sus
+    hijos. Con widening=(C, alpha) se hace ensanchamiento progresivo: un
+    nodo con n visitas puede tener como mucho ceil(C * n**alpha) hijos, que
+    se añaden en orden de CENTER_ORDER (centro primero) en vez de al azar.
+    """
+
+    def __init__(self, s0, main_player, rng, store,
+                 capacity=200_000, batch_size=0, solver=None, widening=None):
         self.s0 = s0
         self.main_player = main_player
         self.rng = rng
         self.c = 1.3
+        self.widening = widening
+        self.batch_size = batch_size
+        self.solver = solver
+        self.visited = 0  # nodos recorridos en total (selección + expansión)
 
-        self.Q_global = Q_global
-        self.N_global = N_global
+        self.store = store
+        self.pool = NodePool(capacity)
+        self.table = TranspositionTable(self.pool)
 
-        self.root_node = Node(
-            board=s0.copy(),
-            player=main_player,
-            untried=self.legal_actions(s0),
-            parent=None
-        )
+        self.set_root(s0, main_player)
 
     def encode(self, board, action):
-        return (tuple(board.flatten()), action)
+        return canonical_edge(board.key, board.mirror_key, action)
 
-    def legal_actions(self, s):
-        return [c for c in range(s.shape[1]) if s[0, c] == 0]
+    def legal_actions(self, board):
+        return board.legal_actions()
 
-    def drop_piece_inplace(self, board, col, player):
-        for r in range(board.shape[0] - 1, -1, -1):
-            if board[r, col] == 0:
-                board[r, col] = player
-                return r
+    def set_root(self, board, player):
+        """Vacía el pool (sin reasignarlo) y deja `board` como raíz."""
+        self.root_board = board.copy()
+        self.root = self.pool.reset(board, player)
+        self.table.clear()
+        self.table.put(min(board.key, board.mirror_key), self.root)
+        self.flipped = False
+
+    def root_solved(self):
+        """Ganador demostrado de la raíz o None."""
+        pool = self.pool
+        solved = int(pool.solved[pool.stat[self.root]])
+        return None if solved == UNSOLVED else solved
+
+    def root_stats(self):
+        """return: dict acción -> (N, W) de los hijos de la raíz."""
+        pool = self.pool
+        return {
+            int(pool.move[ch]): (int(pool.N[pool.stat[ch]]),
+                                 float(pool.W[pool.stat[ch]]))
+            for ch in pool.children(self.root)
+        }
+
+    def child(self, i, action):
+        for ch in self.pool.children(i):
+            if self.pool.move[ch] == action:
+                return ch
         return -1
 
-    def check_win_from(self, board, row, col, player):
-        if row < 0:
-            return False
+    def find_descendant(self, board, depth=2):
+        """
+        Nodo a `depth` jugadas o menos de la raíz con la posición de `board`
+        o su reflejo; -1 si no aparece.
+        """
+        pool = self.pool
+        frontier = [self.root]
+        for _ in range(depth + 1):
+            for i in frontier:
+                key = int(pool.key[i])
+                if key == board.key or key == board.mirror_key:
+                    return i
+            frontier = [ch for i in frontier for ch in pool.children(i)]
+        return -1
 
-        dirs = [(0, 1), (1, 0), (1, 1), (1, -1)]
-        rows, cols = board.shape
-
-        for dr, dc in dirs:
-            count = 1
-
-            r, c = row + dr, col + dc
-            while 0 <= r < rows and 0 <= c < cols and board[r, c] == player:
-                count += 1
-                r += dr
-                c += dc
-
-            r, c = row - dr, col - dc
-            while 0 <= r < rows and 0 <= c < cols and board[r, c] == player:
-                count += 1
-                r -= dr
-                c -= dc
-
-            if count >= 4:
-                return True
-        return False
-
-    def is_winning_move(self, board, col, player):
-        row = -1
-        for r in range(board.shape[0] - 1, -1, -1):
-            if board[r, col] == 0:
-                row = r
-                break
-        if row == -1:
+    def advance_root(self, board, player):
+        """
+        Reutiliza el subárbol de la búsqueda anterior: la nueva posición suele
+        ser la raíz previa más nuestra jugada y la respuesta del rival.
+        Si no aparece entre los descendientes, no tiene hijos (por ejemplo un
+        nodo que el solver demostró al expandirlo) o el pool ya está más que
+        a medias, se vacía el pool y se empieza de cero.
+        `flipped` indica si la raíz está reflejada respecto a `board`.
+        """
+        pool = self.pool
+        i = self.find_descendant(board)
+        if (i < 0 or pool.player[i] != player or pool.first_child[i] < 0
+                or len(pool) > REUSE_LIMIT * pool.capacity):
+            self.set_root(board, player)
+            return
+
+        self.root = i
+        self.root_board = pool.board(i)
+        self.flipped = self.root_board.key != board.key
+
+    def ponder_root(self, action):
+        """
+        Pasa la raíz al hijo de `action` (en la orientación de la raíz) para
+        seguir buscando mientras piensa el rival. La próxima advance_root()
+        encuentra su respuesta un nivel por debajo.
+        return: False si no hay nada que buscar desde ese hijo.
+        """
+        pool = self.pool
+        ch = self.child(self.root, action)
+        if ch < 0 or pool.solved[pool.stat[ch]] != UNSOLVED or not (
+            pool.untried[ch] or pool.first_child[ch] >= 0
+        ):
             return False
-
-        board[row, col] = player
-        win = self.check_win_from(board, row, col, player)
-        board[row, col] = 0
-        return win
-
-    def set_root(self, board, player):
-        self.root_node = Node(
-            board=board.copy(),
-            player=player,
-            untried=self.legal_actions(board),
-            parent=None
-        )
+        self.root_board.play(action, int(pool.player[self.root]))
+        self.root = ch
+        return True
 
     def run(self, time_limit=0.05):
-        start = time.time()
-        while time.time() - start < time_limit:
-            leaf = self.select()
-            leaf, next_node = self.expand(leaf)
-            final, winner = self.simulate(next_node)
-            self.backpropagate(final, winner)
+        return self.search(time_limit=time_limit, early_stop=False)
+
+    def search(self, time_limit=None, iterations=None, nodes=None,
+               early_stop=True):
+        """
+        Búsqueda anytime. Para al agotar cualquiera de los presupuestos
+        dados (segundos medidos con un reloj monotónico, iteraciones o nodos
+        recorridos en el árbol), al quedar demostrada la raíz o, con
+        early_stop, cuando la jugada más visitada ya no puede ser alcanzada
+        por la segunda con lo que queda de presupuesto. Sin presupuestos se
+        usa time_limit=0.05.
+
+        return: SearchResult
+        """
+        if time_limit is None and iterations is None and nodes is None:
+            time_limit = 0.05
+
+        start = time.monotonic()
+        deadline = start + time_limit if time_limit is not None else math.inf
+        visited0 = self.visited
+        done = 0
 
-    def select(self):
-        node = self.root_node
         while True:
-            if node.untried or not node.children:
-                return node
-
-            children = list(node.children.items())
-            parent_log = np.log(max(1, node.N))
-
-            best_a, best_child = max(
-                children,
-                key=lambda kv: (
-                    self.Q_global.get(self.encode(node.board, kv[0]), kv[1].Q)
-                    + self.c * np.sqrt(
-                        parent_log /
-                        self.N_global.get(self.encode(node.board, kv[0]), max(1, kv[1].N))
-                    )
-                )
-            )
-            return best_child
-
-    def expand(self, node):
-        if not node.untried:
-            return node, node
-
-        a = int(self.rng.choice(node.untried))
-        node.untried.remove(a)
-
-        new_board = node.board.copy()
-        self.drop_piece_inplace(new_board, a, node.player)
+            now = time.monotonic()
+            visited = self.visited - visited0
+            if self.root_solved() is not None:
+                reason = "solved"
+            elif now >= deadline:
+                reason = "time"
+            elif iterations is not None and done >= iterations:
+                reason = "iterations"
+            elif nodes is not None and visited >= nodes:
+                reason = "nodes"
+            elif (early_stop and done and done % EARLY_STOP_EVERY == 0
+                  and self.decided(self.remaining(
+                      done, now - start, deadline - now, visited,
+                      iterations, nodes))):
+                reason = "early"
+            else:
+                reason = None
+            if reason is not None:
+                break
 
-        new_node = Node(
-            board=new_board,
-            player=-node.player,
-            untried=self.legal_actions(new_board),
-            parent=node
+            if self.batch_size > 1:
+                batch = self.batch_size
+                if iterations is not None:
+                    batch = min(batch, iterations - done)
+                done += self.step_batched(batch)
+            else:
+                done += self.step()
+
+        return SearchResult(self.root_stats(),
+                            principal_variation(self.pool, self.root),
+                            self.root_solved(), done,
+                            self.visited - visited0,
+                            time.monotonic() - start, reason)
+
+    def remaining(self, done, elapsed, time_left, visited, iterations, nodes):
+        """Estimación de las iteraciones que quedan antes del primer límite."""
+        left = math.inf
+        if iterations is not None:
+            left = iterations - done
+        if time_left != math.inf and elapsed > 0:
+            left = min(left, done / elapsed * time_left)
+        if nodes is not None:
+            left = min(left, done / max(1, visited) * (nodes - visited))
+        return left
+
+    def decided(self, remaining):
+        """True si la segunda jugada más visitada ya no alcanza a la primera."""
+        pool = self.pool
+        visits = sorted((int(pool.N[pool.stat[ch]])
+                         for ch in pool.children(self.root)), reverse=True)
+        if len(visits) < 2:
+            return len(visits) == 1 and not pool.untried[self.root]
+        return visits[0] - visits[1] > remaining
+
+    def step(self):
+        """Una iteración de MCTS."""
+        path, board = self.select()
+        leaf = self.expand(path, board)
+        final, winner = self.simulate(leaf, board)
+        self.store.update(self.backpropagate(path, winner))
+        self.visited += len(path)
+        return 1
+
+    def step_batched(self, batch_size=64):
+        """
+        Igual que step(), pero junta `batch_size` hojas (con pérdida virtual
+        para que no se repita siempre el mismo camino), las simula todas a la
+        vez con simulate_batch() y luego retropropaga el lote completo; las
+        tablas globales se actualizan una sola vez por lote.
+        """
+        pool = self.pool
+        paths = []
+        boards = []
+        for _ in range(batch_size):
+            path, board = self.select()
+            self.expand(path, board)
+            self.add_virtual_loss(path)
+            paths.append(path)
+            boards.append(board)
+
+        winners = simulate_batch(
+            boards,
+            [int(pool.player[path[-1]]) for path in paths],
+            self.rng
         )
-        node.children[a] = new_node
-        return node, new_node
 
-    def simulate(self, node):
-        board = node.board.copy()
-        player = node.player
+        updates = []
+        for path, winner in zip(paths, winners.tolist()):
+            solved = int(pool.solved[pool.stat[path[-1]]])
+            if solved != UNSOLVED:
+                winner = solved
+            self.remove_virtual_loss(path)
+            updates += self.backpropagate(path, winner)
+            self.visited += len(path)
+        self.store.update(updates)
+        return batch_size
+
+    # W se guarda desde el punto de vista del jugador al turno en el nodo, así
+    # que una derrota virtual para quien elige el nodo es un +1 en W
+    def add_virtual_loss(self, path):
+        for s in self.pool.stat[path].tolist():
+            self.pool.N[s] += 1
+            self.pool.W[s] += 1.0
+
+    def remove_virtual_loss(self, path):
+        for s in self.pool.stat[path].tolist():
+            self.pool.N[s] -= 1
+            self.pool.W[s] -= 1.0
+
+    def widen(self, i, children):
+        """True si el nodo `i`, con `children` hijos, admite uno más."""
+        if self.widening is None:
+            return True
+        C, alpha = self.widening
+        n = self.pool.N[self.pool.stat[i]]
+        return children < math.ceil(C * max(1, n) ** alpha)
 
+    def select(self):
+        """
+        Baja desde la raíz hasta el nodo que hay que expandir (o una hoja).
+        Devuelve el camino recorrido como lista de nodos y el tablero del
+        último nodo, reconstruido jugando el camino desde la raíz.
+        Los hijos con resultado demostrado no se vuelven a explorar.
+        """
+        pool = self.pool
+        N, W, stat = pool.N, pool.W, pool.stat
+        i = self.root
+        board = self.root_board.copy()
+        path = [i]
         while True:
-            actions = self.legal_actions(board)
-            if not actions:
-                return node, 0
-
-            for a in actions:
-                if self.is_winning_move(board, a, player):
-                    return node, player
-
-            opp = -player
-            for a in actions:
-                if self.is_winning_move(board, a, opp):
-                    return node, player
-
-            chosen = 3 if 3 in actions else int(self.rng.choice(actions))
-            row = self.drop_piece_inplace(board, chosen, player)
-
-            if self.check_win_from(board, row, chosen, player):
-                return node, player
-
-            player = -player
+            if pool.solved[stat[i]] != UNSOLVED:
+                return path, board
+
+            children = np.fromiter(pool.children(i), dtype=np.int64)
+            if pool.untried[i] and self.widen(i, len(children)):
+                return path, board
+
+            children = children[pool.solved[stat[children]] == UNSOLVED]
+            if not len(children):
+                # todo lo expandido está demostrado: si quedan jugadas sin
+                # probar se expande aunque el ensanchamiento no toque
+                if not pool.untried[i]:
+                    self.prove(i)
+                return path, board
+
+            # estadísticas globales de cada arista: prior + lo visto en este
+            # árbol (por cualquier camino que llegue a la misma posición).
+            # Q es el valor para el jugador al turno en el hijo (el rival de
+            # quien elige), de ahí el signo
+            s = stat[children]
+            n = np.maximum(pool.prior_n[children] + N[s], 1)
+            q = (pool.prior_w[children] + W[s]) / n
+            scores = -q + self.c * np.sqrt(math.log(max(1, N[stat[i]])) / n)
+            best = int(children[np.argmax(scores)])
+
+            board.play(int(pool.move[best]), int(pool.player[i]))
+            path.append(best)
+            i = best
+
+    def expand(self, path, board):
+        """
+        Añade al pool un hijo del último nodo del camino (si le quedan
+        jugadas sin probar y hay sitio) y deja `board` en ese hijo.
+        return: índice de la hoja desde la que simular.
+        """
+        pool = self.pool
+        i = path[-1]
+        untried = int(pool.untried[i])
+        if not untried:
+            return i
+
+        if self.widening is None:
+            actions = [a for a in range(COLS) if untried & (1 << a)]
+            a = int(self.rng.choice(actions))
+        else:
+            a = next(a for a in CENTER_ORDER if untried & (1 << a))
+        player = int(pool.player[i])
+        key = self.encode(board, a)
+
+        board.play(a, player)
+        won = board.has_won(player)
+        child = pool.alloc(i, a, board, -player, untried=0 if won else None,
+                           edge=key)
+        if child < 0:
+            # pool lleno: el árbol deja de crecer y se simula desde i
+            board.undo(a, player)
+            return i
+
+        pool.untried[i] = untried & ~(1 << a)
+        prior = self.store.lookup(key)
+        if prior is not None:
+            pool.prior_w[child] = prior[0] * prior[1]
+            pool.prior_n[child] = prior[1]
+
+        canon = min(board.key, board.mirror_key)
+        shared = self.table.get(canon)
+        if shared >= 0:
+            # transposición: N/W/solved son los del nodo que ya la tenía
+            pool.stat[child] = pool.stat[shared]
+            path.append(child)
+            return child
+        self.table.put(canon, child)
+
+        if won:
+            pool.solved[child] = player
+        elif not pool.untried[child]:
+            pool.solved[child] = 0
+        else:
+            self.solve(child, board)
+
+        path.append(child)
+        return child
+
+    def solve(self, i, board):
+        """Resuelve el nodo con el solver si quedan pocas casillas libres."""
+        if self.solver is None or CELLS - board.moves > EXPAND_SOLVER_EMPTY:
+            return
+        player = int(self.pool.player[i])
+        result = self.solver.solve(board, player,
+                                   max_nodes=EXPAND_SOLVER_NODES)
+        if result is not None:
+            self.pool.solved[self.pool.stat[i]] = result[0] * player
+
+    def prove(self, i):
+        """
+        Reglas de minimax sobre los hijos demostrados: el nodo está ganado si
+        algún hijo lo gana para el jugador al turno, y perdido (o empatado) si
+        ya se expandieron todos los hijos y todos están demostrados.
+        return: True si el nodo queda demostrado.
+        """
+        pool = self.pool
+        s = pool.stat[i]
+        if pool.solved[s] != UNSOLVED:
+            return True
+        player = int(pool.player[i])
+        results = [int(pool.solved[pool.stat[ch]]) for ch in pool.children(i)]
+        if player in results:
+            pool.solved[s] = player
+        elif pool.untried[i] or UNSOLVED in results:
+            return False
+        else:
+            pool.solved[s] = 0 if 0 in results else -player
+        return True
+
+    def best_action(self):
+        """
+        Jugada de la raíz: una ganadora demostrada si la hay; si no, la más
+        visitada, dejando para el final las que pierden con seguridad.
+        """
+        pool = self.pool
+        player = int(pool.player[self.root])
+        if pool.first_child[self.root] < 0:
+            # raíz sin hijos (demostrada al expandirla o sin iteraciones): el
+            # solver con el presupuesto de la jugada o, si no llega, la
+            # primera jugada legal. Por nodos y no por tiempo, para que la
+            # búsqueda por iteraciones siga siendo reproducible
+            result = (self.solver.solve(self.root_board, player,
+                                        max_nodes=SOLVER_NODES)
+                      if self.solver is not None else None)
+            if result is not None:
+                return result[1]
+            return self.root_board.legal_actions()[0]
+        solved, N, stat = pool.solved, pool.N, pool.stat
+        best = max(
+            pool.children(self.root),
+            key=lambda ch: (
+                solved[stat[ch]] == player,
+                solved[stat[ch]] != -player,
+                N[stat[ch]]
+            )
+        )
+        return int(pool.move[best])
+
+    def simulate(self, i, board):
+        solved = int(self.pool.solved[self.pool.stat[i]])
+        if solved != UNSOLVED:
+            return i, solved
+        return i, simulate_one(board, int(self.pool.player[i]), self.rng)
+
+    def backpropagate(self, path, winner):
+        """
+        Actualiza N/W del camino y devuelve las actualizaciones de las tablas
+        globales como lista de (pool.edge del nodo, recompensa); la raíz no
+        tiene arista propia en esta búsqueda y no se incluye.
+        """
+        pool = self.pool
+        # resultados demostrados: suben mientras el padre quede demostrado
+        for k in range(len(path) - 2, -1, -1):
+            if (pool.solved[pool.stat[path[k + 1]]] == UNSOLVED
+                    or not self.prove(path[k])):
+                break
 
-    def backpropagate(self, leaf, winner):
-        node = leaf
-        while node is not None:
-            node.N += 1
+        updates = []
+        for i in reversed(path):
+            s = pool.stat[i]
+            pool.N[s] += 1
 
+            player = pool.player[i]
             reward = (
-                1.0 if winner == node.player else
+                1.0 if winner == player else
                 -1.0 if winner != 0 else
                 0.0
             )
-
-            node.W += reward
-            node.Q = node.W / node.N
-
-            if node.parent is not None:
-                for action, child in node.parent.children.items():
-                    if child is node:
-                        key = self.encode(node.parent.board, action)
-                        self.N_global[key] = self.N_global.get(key, 0) + 1
-                        self.Q_global[key] = (
-                            self.Q_global.get(key, 0.0)
-                            + (reward - self.Q_global.get(key, 0.0))
-                              / self.N_global[key]
-                        )
-                        break
-
-            node = node.parent
+            pool.W[s] += reward
+            if i != path[0]:
+                updates.append((int(pool.edge[i]), reward))
+        return updates
 
 
 class MyPolicy:
 
-    def __init__(self):
-        self.q_file = "q_values.json"
-
-        if os.path.exists(self.q_file):
-            with open(self.q_file, "r") as f:
-                data = json.load(f)
-                self.Q_global = {eval(k): v for k, v in data.get("Q", {}).items()}
-                self.N_global = {eval(k): v for k, v in data.get("N", {}).items()}
-        else:
-            self.Q_global = {}
-            self.N_global = {}
+    def __init__(self, batch_size=0, workers=0, parallel="root",
+                 capacity=200_000, time_limit=0.05, iterations=None,
+                 clock=None, ponder=False, widening=None, q_dir="q_values"):
+        # presupuesto de cada búsqueda: lo reparte `clock` (por defecto
+        # time_limit segundos por jugada) o, si se da `iterations`, un número
+        # fijo de iteraciones que se gastan enteras salvo que la raíz quede
+        # demostrada (búsqueda reproducible, sin reloj: con la misma semilla
+        # y el mismo q_dir de partida los árboles salen idénticos)
+        self.time_limit = time_limit
+        self.iterations = iterations
+        self.clock = clock if clock is not None else TimeManager(
+            move_time=time_limit
+        )
+        # ponder=True sigue buscando en un hilo mientras piensa el rival
+        self.ponder = ponder
+        self.ponder_thread = None
+        self.ponder_stop = threading.Event()
+        self.last_result = None
+        # batch_size > 1 activa las simulaciones vectorizadas por lotes
+        self.batch_size = batch_size
+        # (C, alpha) activa el ensanchamiento progresivo del árbol
+        self.widening = widening
+        # workers > 1 activa la búsqueda paralela: "root" (un árbol por
+        # proceso) o "tree" (un único árbol en memoria compartida)
+        self.workers = workers
+        self.parallel = parallel
+        self.pool = None
+        # semilla de seed() y número de partidas montadas desde entonces:
+        # cada partida (y cada proceso de búsqueda) usa su propio flujo
+        self.rng_seed = None
+        self.game = 0
+        # tablas Q/N repartidas en shards dentro de q_values/; la primera vez
+        # se importan las de q_values.bin o q_values.json si existen junto a
+        # la carpeta
+        # capacity = máximo de entradas Q/N en memoria (None = sin límite)
+        self.q_dir = q_dir
+        self.capacity = capacity
+        parent = os.path.dirname(q_dir)
+        self.store = open_store(
+            q_dir, legacy_bin=os.path.join(parent, "q_values.bin"),
+            legacy_json=os.path.join(parent, "q_values.json"),
+            capacity=capacity
+        )
+        self.Q_global = self.store.Q
+        self.N_global = self.store.N
+        # jugadas precalculadas para las primeras fichas (python book.py)
+        self.book = OpeningBook("opening_book.bin")
+        self.solver = Solver()
 
         self.mount()
 
+    def seed(self, seed):
+        """Fija la semilla de la búsqueda a partir del siguiente mount()."""
+        self.rng_seed = seed
+        self.game = 0
+
     def mount(self, *args, **kwargs):
-        init_state = np.zeros((6, 7), dtype=int)
-        rng = np.random.RandomState()
+        self.stop_pondering()
+        # el recorte de las tablas Q/N (que pliega el diario en los shards)
+        # se hace entre partidas: dentro de una jugada se comería su tiempo
+        self.store.trim()
+        init_state = BitBoard()
+        seed = sequence(self.rng_seed, self.game)
+        self.game += 1
+        rng = random_state(seed)
+        self.clock.start_game()
 
         self.mcts = MonteCarloTreeSearchConnectFour(
             s0=init_state,
             main_player=-1,
             rng=rng,
-            Q_global=self.Q_global,
-            N_global=self.N_global
+            store=self.store,
+            batch_size=self.batch_size,
+            solver=self.solver,
+            widening=self.widening
         )
 
+        if self.workers > 1:
+            self.close()
+            if self.parallel == "tree":
+                self.pool = TreeParallelSearch(self.workers, seed=seed)
+            else:
+                self.pool = RootParallelSearch(
+                    self.workers,
+                    MonteCarloTreeSearchConnectFour,
+                    self.q_dir,
+                    seed=seed,
+                    capacity=self.capacity,
+                    batch_size=self.batch_size,
+                    solver=self.solver,
+                    widening=self.widening
+                )
+
+    def close(self):
+        self.stop_pondering()
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+
+    def flush(self):
+        """Vuelca al disco lo aprendido desde el último flush()."""
+        self.stop_pondering()
+        self.store.flush()
+
     def finalize(self):
-        data = {
-            "Q": {str(k): v for k, v in self.Q_global.items()},
-            "N": {str(k): v for k, v in self.N_global.items()}
-        }
-        with open(self.q_file, "w") as f:
-            json.dump(data, f, indent=4)
+        # el diario se pliega aquí, así la próxima vez que se abra el
+        # almacén no hay nada pendiente y el constructor no escribe
+        self.flush()
+        self.store.join()
+        self.store.compact()
+        self.close()
 
     def infer_player(self, s):
         ones = np.sum(s == 1)
         negs = np.sum(s == -1)
         return 1 if ones == negs else -1
 
+    # ------------- búsqueda durante el turno del rival -------------
+    def start_pondering(self, action):
+        """
+        Lanza el hilo que sigue expandiendo el árbol desde la posición tras
+        `action` (en la orientación del árbol). Mientras el hilo vive es el
+        único que toca el árbol, el solver y las tablas Q/N; stop_pondering()
+        lo detiene y espera a que suelte el árbol antes de devolverlo.
+        En un mismo proceso el hilo compite por el GIL con el rival.
+        """
+        if not self.ponder or self.pool is not None or self.iterations is not None:
+            return
+        if not self.mcts.ponder_root(action):
+            return
+        self.ponder_stop.clear()
+        self.ponder_thread = threading.Thread(target=self._ponder, daemon=True)
+        self.ponder_thread.start()
+
+    def _ponder(self):
+        mcts = self.mcts
+        deadline = time.monotonic() + PONDER_MAX
+        while (not self.ponder_stop.is_set() and time.monotonic() < deadline
+               and mcts.root_solved() is None):
+            if mcts.batch_size > 1:
+                mcts.step_batched(mcts.batch_size)
+            else:
+                mcts.step()
+
+    def stop_pondering(self):
+        if self.ponder_thread is not None:
+            self.ponder_stop.set()
+            self.ponder_thread.join()
+            self.ponder_thread = None
+
     def act(self, s):
+        self.stop_pondering()
+        start = time.monotonic()
+        try:
+            return self.choose(s)
+        finally:
+            self.clock.spend(time.monotonic() - start)
+
+    def choose(self, s):
+        start = time.monotonic()
         player = self.infer_player(s)
-        legal = self.mcts.legal_actions(s)
+        # Se razona siempre sobre la orientación canónica del tablero, así que
+        # dos posiciones reflejadas reciben jugadas reflejadas.
+        board, flipped = BitBoard.from_array(s).canonical()
+        legal = board.legal_actions()
 
         if not legal:
             return 0
+        if len(legal) == 1:
+            return 6 - legal[0] if flipped else legal[0]
 
         for a in legal:
-            if self.mcts.is_winning_move(s, a, player):
-                return a
+            if board.is_winning_move(a, player):
+                return 6 - a if flipped else a
 
         opp = -player
         for a in legal:
-            if self.mcts.is_winning_move(s, a, opp):
-                return a
+            if board.is_winning_move(a, opp):
+                return 6 - a if flipped else a
+
+        move = self.book.probe(board)
+        if move is not None and move in legal:
+            return 6 - move if flipped else move
+
+        if CELLS - board.moves <= SOLVER_EMPTY:
+            if self.iterations is not None:
+                result = self.solver.solve(board, player,
+                                           max_nodes=SOLVER_NODES)
+            else:
+                result = self.solver.solve(board, player,
+                                           time_limit=SOLVER_TIME)
+            if result is not None:
+                move = result[1]
+                return 6 - move if flipped else move
 
         self.mcts.main_player = player
 
-        self.mcts.set_root(s, player)
-        self.mcts.run(time_limit=0.05)
+        if self.pool is not None:
+            base = self.clock.allocate(board, time.monotonic() - start)
+            stats = self.pool.search(board, player, time_limit=base)
+            best = max(stats, key=lambda a: stats[a][0])
+            return int(6 - best if flipped else best)
 
-        root = self.mcts.root_node
-        best = max(root.children, key=lambda a: root.children[a].N)
+        self.mcts.advance_root(board, player)
+        if self.iterations is not None:
+            self.last_result = self.mcts.search(iterations=self.iterations,
+                                                early_stop=False)
+        else:
+            # lo que ya se llevó el solver sale del tiempo de la jugada
+            base = self.clock.allocate(board, time.monotonic() - start)
+            result = self.mcts.search(time_limit=base)
+            if result.reason == "time":
+                extra = self.clock.extension(list(result.visits.values()),
+                                             list(result.values.values()),
+                                             base)
+                if extra > 0:
+                    result = self.mcts.search(time_limit=extra)
+            self.last_result = result
+
+        best = self.mcts.best_action()
+        self.start_pondering(best)
+        if flipped != self.mcts.flipped:
+            best = 6 - best
         return int(best)
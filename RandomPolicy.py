@@ -1,11 +1,21 @@
 import numpy as np
 
+from seeding import generator
+
 class RandomPolicy:
 
+    def __init__(self):
+        self.rng = None
+
+    def seed(self, seed) -> None:
+        self.rng = generator(seed)
+
     def mount(self) -> None:
         pass
 
     def act(self, s: np.ndarray) -> int:
-        rng = np.random.default_rng()
+        if self.rng is None:
+            # sin seed(): un solo flujo con entropía del sistema
+            self.rng = generator(None)
         available_cols = [c for c in range(7) if s[0, c] == 0]
-        return int(rng.choice(available_cols))
+        return int(self.rng.choice(available_cols))
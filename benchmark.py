@@ -0,0 +1,103 @@
+import os
+import sys
+import tempfile
+import time
+from functools import partial
+
+from bitboard import BitBoard
+from DeterministicPolicy import DeterministicPolicy
+from MyPolicy import MyPolicy
+from seeding import random_state
+from tournament import tournament_parallel
+
+
+# ---------------------------------
+# CONFIGURACIONES A COMPARAR
+# ---------------------------------
+# nombre -> argumentos de MyPolicy
+CONFIGS = {
+    "uct": {},
+    "widening": {"widening": (1.0, 0.5)},
+    "widening-lento": {"widening": (0.5, 0.5)},
+}
+
+
+def positions(count=8, moves=6, seed=0):
+    """
+    Posiciones de prueba: `count` tableros con `moves` fichas jugadas al
+    azar (sin que nadie haya ganado), siempre las mismas para una semilla.
+    """
+    rng = random_state(seed)
+    boards = []
+    while len(boards) < count:
+        board = BitBoard()
+        player = 1
+        for _ in range(moves):
+            a = int(rng.choice(board.legal_actions()))
+            board.play(a, player)
+            if board.has_won(player):
+                break
+            player = -player
+        else:
+            boards.append((board, player))
+    return boards
+
+
+def search_rate(config, boards, iterations=2000, seed=0):
+    """
+    Velocidad de la búsqueda con `config`: el mismo número de iteraciones
+    desde cada posición de `boards`, con la semilla fija y unas tablas Q/N
+    vacías, así que cada ejecución construye exactamente los mismos árboles
+    y solo cambia el tiempo.
+    return: (iteraciones por segundo, profundidad media de la PV)
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        policy = MyPolicy(q_dir=os.path.join(tmp, "q_values"), **config)
+        policy.seed(seed)
+        policy.mount()
+        mcts = policy.mcts
+
+        done = 0
+        depth = 0
+        start = time.perf_counter()
+        for board, player in boards:
+            mcts.set_root(board, player)
+            result = mcts.search(iterations=iterations, early_stop=False)
+            done += result.iterations
+            depth += len(result.pv)
+        elapsed = time.perf_counter() - start
+
+        policy.finalize()
+    return done / elapsed, depth / len(boards)
+
+
+def win_rate(config, games=40, workers=None, seed=0):
+    """
+    Resultado de MyPolicy(**config) contra DeterministicPolicy, alternando
+    colores, con las partidas repartidas entre procesos. Cada configuración
+    empieza con sus propias tablas Q/N vacías, para no heredar lo aprendido
+    por otra ni tocar las del jugador.
+    return: (fracción de victorias, dict de resultados)
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        policy = partial(MyPolicy, q_dir=os.path.join(tmp, "q_values"),
+                         **config)
+        results = tournament_parallel(policy, DeterministicPolicy, games,
+                                      workers, seed)
+    return results["A"] / games, results
+
+
+def run(names=None, games=40, iterations=2000, workers=None, seed=0):
+    boards = positions(seed=seed)
+    for name in names or CONFIGS:
+        config = CONFIGS[name]
+        rate, depth = search_rate(config, boards, iterations, seed)
+        wins, results = win_rate(config, games, workers, seed)
+        print(f"{name:<16} {rate:8.0f} it/s   PV {depth:4.1f}   "
+              f"victorias {wins:6.1%}  {results}")
+
+
+if __name__ == "__main__":
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    names = sys.argv[2:] or None
+    run(names, games)
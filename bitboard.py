@@ -0,0 +1,252 @@
+import numpy as np
+
+
+ROWS = 6
+COLS = 7
+CELLS = ROWS * COLS
+H1 = ROWS + 1  # cada columna usa 7 bits: 6 casillas + 1 centinela
+
+# ---------------------------------
+# MÁSCARAS PRECALCULADAS
+# ---------------------------------
+# Bit (c * H1 + r) = casilla de la columna c, fila r contada desde abajo.
+BOTTOM = sum(1 << (c * H1) for c in range(COLS))
+BOARD_MASK = BOTTOM * ((1 << ROWS) - 1)
+COLUMN_LIMIT = [c * H1 + ROWS for c in range(COLS)]
+COLUMN_BITS = (1 << H1) - 1
+COLUMN_MASKS = [COLUMN_BITS << (c * H1) for c in range(COLS)]
+# desplazamiento (en bits) entre una casilla y su reflejo horizontal
+MIRROR_OFFSET = [(COLS - 1 - 2 * c) * H1 for c in range(COLS)]
+ACTION_BITS = 3
+# columnas del centro hacia fuera: orden en que conviene probar las jugadas
+CENTER_ORDER = (3, 2, 4, 1, 5, 0, 6)
+
+# multiplicador de Fibonacci para repartir claves en las tablas hash
+HASH_MULT = 0x9E3779B97F4A7C15
+MASK64 = (1 << 64) - 1
+
+
+def pack_key(key, action):
+    """Empaqueta (clave de posición, acción) en un solo entero < 2**52."""
+    return (key << ACTION_BITS) | action
+
+
+def unpack_key(packed):
+    return packed >> ACTION_BITS, packed & ((1 << ACTION_BITS) - 1)
+
+
+def mirror_bits(x):
+    """Refleja una máscara (o una clave) intercambiando la columna c por 6 - c."""
+    out = 0
+    for c in range(COLS):
+        out |= ((x >> (c * H1)) & COLUMN_BITS) << ((COLS - 1 - c) * H1)
+    return out
+
+
+def canonical_edge(key, mirror_key, action):
+    """
+    Clave empaquetada de (posición, acción) invariante a la simetría
+    izquierda-derecha: se usa la menor de las dos orientaciones y la acción
+    se refleja (a -> 6 - a) si hace falta. En posiciones simétricas a y
+    6 - a son la misma jugada.
+    """
+    if mirror_key < key:
+        return pack_key(mirror_key, COLS - 1 - action)
+    if mirror_key == key:
+        action = min(action, COLS - 1 - action)
+    return pack_key(key, action)
+
+
+def canonical_packed(packed):
+    key, action = unpack_key(packed)
+    return canonical_edge(key, mirror_bits(key), action)
+
+
+def four_in_a_row(pieces):
+    """True si la máscara `pieces` contiene cuatro en línea."""
+    # vertical
+    m = pieces & (pieces >> 1)
+    if m & (m >> 2):
+        return True
+    # horizontal
+    m = pieces & (pieces >> H1)
+    if m & (m >> (2 * H1)):
+        return True
+    # diagonal /
+    m = pieces & (pieces >> (H1 + 1))
+    if m & (m >> (2 * (H1 + 1))):
+        return True
+    # diagonal \
+    m = pieces & (pieces >> (H1 - 1))
+    if m & (m >> (2 * (H1 - 1))):
+        return True
+    return False
+
+
+def winning_cells(pieces, mask):
+    """
+    Casillas vacías que completarían un cuatro en línea para `pieces`.
+    Funciona igual con enteros de Python que con arrays np.uint64.
+    """
+    # vertical
+    r = (pieces << 1) & (pieces << 2) & (pieces << 3)
+
+    for s in (H1, H1 - 1, H1 + 1):
+        # horizontal y diagonales: huecos en los extremos y en medio
+        p = (pieces << s) & (pieces << (2 * s))
+        r |= p & (pieces << (3 * s))
+        r |= p & (pieces >> s)
+        p = (pieces >> s) & (pieces >> (2 * s))
+        r |= p & (pieces << s)
+        r |= p & (pieces >> (3 * s))
+
+    return r & (BOARD_MASK ^ mask)
+
+
+class BitBoard:
+    """
+    Estado de Connect Four como dos máscaras de bits (rojo = 1, amarillo = -1)
+    más la altura de cada columna. Soltar una ficha, comprobar victoria y
+    generar jugadas legales son operaciones O(1) sobre enteros.
+
+    `key` identifica la posición de forma única (red + mask + BOTTOM, cabe
+    en 49 bits) y `mirror_key` es la clave de su reflejo; ambas se
+    actualizan de forma incremental en play/undo.
+    """
+
+    __slots__ = ("red", "yellow", "heights", "moves", "key", "mirror_key")
+
+    def __init__(self, red=0, yellow=0, heights=None, moves=0, key=None,
+                 mirror_key=None):
+        self.red = red
+        self.yellow = yellow
+        self.heights = (
+            list(heights) if heights is not None
+            else [c * H1 for c in range(COLS)]
+        )
+        self.moves = moves
+        self.key = key if key is not None else red + (red | yellow) + BOTTOM
+        self.mirror_key = (
+            mirror_key if mirror_key is not None else mirror_bits(self.key)
+        )
+
+    # ------------- conversión con el tablero (6, 7) -------------
+    @classmethod
+    def from_array(cls, s):
+        cells = s.tolist()
+        red = 0
+        yellow = 0
+        heights = []
+        for c in range(COLS):
+            h = c * H1
+            for r in range(ROWS - 1, -1, -1):
+                v = cells[r][c]
+                if v == 0:
+                    break
+                if v == 1:
+                    red |= 1 << h
+                else:
+                    yellow |= 1 << h
+                h += 1
+            heights.append(h)
+        moves = bin(red | yellow).count("1")
+        return cls(red, yellow, heights, moves)
+
+    @classmethod
+    def from_key(cls, key):
+        """Reconstruye el tablero a partir de su clave (red + mask + BOTTOM)."""
+        red = 0
+        mask = 0
+        heights = []
+        for c in range(COLS):
+            col = (key >> (c * H1)) & COLUMN_BITS
+            h = col.bit_length() - 1
+            filled = (1 << h) - 1
+            red |= (col - (1 << h)) << (c * H1)
+            mask |= filled << (c * H1)
+            heights.append(c * H1 + h)
+        return cls(red, mask ^ red, heights, bin(mask).count("1"), key)
+
+    def to_array(self):
+        s = np.zeros((ROWS, COLS), dtype=int)
+        for c in range(COLS):
+            for r in range(ROWS):
+                bit = 1 << (c * H1 + r)
+                if self.red & bit:
+                    s[ROWS - 1 - r, c] = 1
+                elif self.yellow & bit:
+                    s[ROWS - 1 - r, c] = -1
+        return s
+
+    def copy(self):
+        return BitBoard(self.red, self.yellow, self.heights, self.moves,
+                        self.key, self.mirror_key)
+
+    def mirrored(self):
+        heights = [
+            self.heights[COLS - 1 - c] + MIRROR_OFFSET[COLS - 1 - c]
+            for c in range(COLS)
+        ]
+        return BitBoard(mirror_bits(self.red), mirror_bits(self.yellow),
+                        heights, self.moves, self.mirror_key, self.key)
+
+    def canonical(self):
+        """(tablero en su orientación canónica, True si hubo que reflejarlo)."""
+        if self.mirror_key < self.key:
+            return self.mirrored(), True
+        return self, False
+
+    # ------------- consultas -------------
+    @property
+    def mask(self):
+        return self.red | self.yellow
+
+    def pieces(self, player):
+        return self.red if player == 1 else self.yellow
+
+    def legal_actions(self):
+        h = self.heights
+        return [c for c in range(COLS) if h[c] < COLUMN_LIMIT[c]]
+
+    def is_full(self):
+        return self.moves == CELLS
+
+    def is_winning_move(self, col, player):
+        if self.heights[col] >= COLUMN_LIMIT[col]:
+            return False
+        return four_in_a_row(self.pieces(player) | (1 << self.heights[col]))
+
+    def has_won(self, player):
+        return four_in_a_row(self.pieces(player))
+
+    # ------------- modificación -------------
+    def play(self, col, player):
+        h = self.heights[col]
+        bit = 1 << h
+        mbit = 1 << (h + MIRROR_OFFSET[col])
+        if player == 1:
+            self.red |= bit
+            self.key += bit << 1
+            self.mirror_key += mbit << 1
+        else:
+            self.yellow |= bit
+            self.key += bit
+            self.mirror_key += mbit
+        self.heights[col] += 1
+        self.moves += 1
+        return bit
+
+    def undo(self, col, player):
+        self.heights[col] -= 1
+        self.moves -= 1
+        h = self.heights[col]
+        bit = 1 << h
+        mbit = 1 << (h + MIRROR_OFFSET[col])
+        if player == 1:
+            self.red &= ~bit
+            self.key -= bit << 1
+            self.mirror_key -= mbit << 1
+        else:
+            self.yellow &= ~bit
+            self.key -= bit
+            self.mirror_key -= mbit
@@ -0,0 +1,137 @@
+import sys
+import threading
+import time
+
+import numpy as np
+
+from bitboard import BitBoard
+from nodepool import NodePool
+from seeding import random_state
+from tree_parallel import search_tree
+
+
+# ---------------------------------
+# FORMATO DEL ARCHIVO
+# ---------------------------------
+# Cabecera de 16 bytes (magic, versión, profundidad, número de entradas) y
+# registros de 13 bytes ordenados por clave. Solo se guardan posiciones
+# canónicas (la orientación menor de cada par reflejado), con la jugada en
+# esa misma orientación; así el libro ocupa la mitad.
+MAGIC = b"C4OB"
+VERSION = 1
+HEADER = np.dtype([("magic", "S4"), ("version", "<u4"),
+                   ("depth", "<u4"), ("count", "<u4")])
+ENTRY = np.dtype([("key", "<u8"), ("move", "i1"), ("value", "<f4")])
+
+
+def player_to_move(board):
+    return 1 if board.moves % 2 == 0 else -1
+
+
+def positions(depth):
+    """Posiciones canónicas no terminales con `depth` fichas o menos."""
+    level = {BitBoard().key: BitBoard()}
+    found = dict(level)
+
+    for _ in range(depth):
+        nxt = {}
+        for board in level.values():
+            player = player_to_move(board)
+            for a in board.legal_actions():
+                child = board.copy()
+                child.play(a, player)
+                if child.has_won(player):
+                    continue
+                child, _ = child.canonical()
+                nxt.setdefault(child.key, child)
+        found.update(nxt)
+        level = nxt
+
+    return [found[k] for k in sorted(found)]
+
+
+def search(board, time_limit, rng, pool, c=1.3):
+    """
+    MCTS desde `board` durante `time_limit` segundos sobre un NodePool.
+    return: (mejor jugada por visitas, su valor W/N para el jugador al turno)
+    """
+    pool.reset(board, player_to_move(board))
+    search_tree(pool, threading.Lock(), rng, board,
+                time.monotonic() + time_limit, c)
+
+    # W del hijo es para el jugador al turno en el hijo, el rival
+    best = max(pool.children(0), key=lambda ch: pool.N[ch])
+    return int(pool.move[best]), float(-pool.W[best] / max(1, pool.N[best]))
+
+
+def build_book(path, depth=4, time_limit=1.0, seed=None, capacity=500_000,
+               verbose=False):
+    boards = positions(depth)
+    rng = random_state(seed)
+    pool = NodePool(capacity)
+
+    entries = np.zeros(len(boards), dtype=ENTRY)
+    for i, board in enumerate(boards):
+        move, value = search(board, time_limit, rng, pool)
+        entries[i] = (board.key, move, value)
+        if verbose:
+            print(f"\r{i + 1}/{len(boards)}", end="", flush=True)
+    if verbose:
+        print()
+
+    header = np.array([(MAGIC, VERSION, depth, len(entries))], dtype=HEADER)
+    with open(path, "wb") as f:
+        f.write(header.tobytes())
+        f.write(entries.tobytes())
+    return entries
+
+
+class OpeningBook:
+    """
+    Libro de aperturas cargado en un dict clave canónica -> (jugada, valor),
+    así que cada consulta es O(1). Si el archivo no existe el libro está
+    vacío y probe() siempre devuelve None.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.depth = 0
+        self.moves = {}
+
+        try:
+            header = np.fromfile(path, dtype=HEADER, count=1)
+        except FileNotFoundError:
+            return
+        if len(header) == 0 or header[0]["magic"] != MAGIC:
+            raise ValueError(f"{path} no es un libro de aperturas válido")
+
+        self.depth = int(header[0]["depth"])
+        entries = np.fromfile(path, dtype=ENTRY, offset=HEADER.itemsize,
+                              count=int(header[0]["count"]))
+        self.moves = {
+            k: (m, v) for k, m, v in zip(entries["key"].tolist(),
+                                         entries["move"].tolist(),
+                                         entries["value"].tolist())
+        }
+
+    def __len__(self):
+        return len(self.moves)
+
+    def probe(self, board):
+        """
+        Jugada del libro para `board`, que debe estar en orientación
+        canónica, o None si la posición no está en el libro.
+        """
+        if board.moves > self.depth:
+            return None
+        entry = self.moves.get(board.key)
+        return None if entry is None else entry[0]
+
+
+if __name__ == "__main__":
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    time_limit = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+    out = sys.argv[3] if len(sys.argv) > 3 else "opening_book.bin"
+
+    entries = build_book(out, depth, time_limit, verbose=True)
+    print(f"{len(entries)} posiciones guardadas en {out}")
@@ -0,0 +1,186 @@
+import numpy as np
+
+from bitboard import HASH_MULT, MASK64, BitBoard, COLS
+
+
+# (campo, tipo) de cada array del árbol
+FIELDS = (
+    ("N", np.int64),
+    ("W", np.float64),
+    ("parent", np.int32),
+    ("first_child", np.int32),
+    ("next_sibling", np.int32),
+    ("move", np.int8),
+    ("player", np.int8),
+    ("untried", np.uint8),   # bit c = acción c sin expandir
+    ("key", np.uint64),      # clave de BitBoard de la posición
+    ("edge", np.uint64),     # clave canónica (posición del padre, jugada)
+    ("solved", np.int8),     # ganador demostrado (1, -1, 0) o UNSOLVED
+    ("prior_w", np.float64), # suma de recompensas globales de la arista al crear el nodo
+    ("prior_n", np.int64),   # visitas globales de la arista al crear el nodo
+    ("stat", np.int32),      # nodo que guarda N/W/solved de la posición (él mismo
+                             # salvo que sea una transposición de otro)
+)
+META = 2  # meta[0] = nodos en uso, meta[1] = nodos descartados por falta de espacio
+UNSOLVED = 2
+
+MAX_PROBE = 8  # casillas que se sondean en la tabla de transposición
+
+
+def mask_of(actions):
+    m = 0
+    for a in actions:
+        m |= 1 << a
+    return m
+
+
+class NodePool:
+    """
+    Árbol de MCTS como struct-of-arrays: un array por campo y un índice por
+    nodo (0 es la raíz, -1 significa "ninguno"). Los hijos forman una lista
+    enlazada first_child / next_sibling y el tablero de cada nodo se
+    reconstruye a partir de su clave en lugar de guardarse.
+
+    Los arrays pueden vivir en cualquier buffer, por ejemplo un bloque de
+    multiprocessing.shared_memory compartido entre procesos.
+    """
+
+    def __init__(self, capacity, buffer=None):
+        self.capacity = capacity
+        if buffer is None:
+            buffer = bytearray(self.nbytes(capacity))
+
+        offset = 0
+        for name, dtype in FIELDS:
+            arr = np.ndarray((capacity,), dtype=dtype, buffer=buffer, offset=offset)
+            setattr(self, name, arr)
+            offset += arr.nbytes
+        self.meta = np.ndarray((META,), dtype=np.int64, buffer=buffer, offset=offset)
+
+    @staticmethod
+    def nbytes(capacity):
+        return sum(np.dtype(t).itemsize for _, t in FIELDS) * capacity + 8 * META
+
+    def __len__(self):
+        return int(self.meta[0])
+
+    def release(self):
+        """Suelta las vistas sobre el buffer (necesario antes de cerrarlo)."""
+        for name, _ in FIELDS:
+            setattr(self, name, None)
+        self.meta = None
+
+    # ------------- construcción -------------
+    def reset(self, board, player):
+        """Vacía el árbol y deja `board` como raíz (índice 0)."""
+        self.meta[0] = 0
+        self.meta[1] = 0
+        return self.alloc(-1, -1, board, player)
+
+    def alloc(self, parent, move, board, player, untried=None, edge=0):
+        """
+        Añade un nodo hijo de `parent`; devuelve su índice o -1 si no cabe.
+        `edge` es la clave de la arista que llega al nodo en las tablas
+        globales, para no recalcularla en cada retropropagación.
+        """
+        i = int(self.meta[0])
+        if i >= self.capacity:
+            self.meta[1] += 1
+            return -1
+        self.meta[0] = i + 1
+
+        self.N[i] = 0
+        self.W[i] = 0.0
+        self.parent[i] = parent
+        self.first_child[i] = -1
+        self.next_sibling[i] = -1
+        self.move[i] = move
+        self.player[i] = player
+        self.untried[i] = (
+            mask_of(board.legal_actions()) if untried is None else untried
+        )
+        self.key[i] = board.key
+        self.edge[i] = edge
+        self.solved[i] = UNSOLVED
+        self.prior_w[i] = 0.0
+        self.prior_n[i] = 0
+        self.stat[i] = i
+
+        if parent >= 0:
+            self.next_sibling[i] = self.first_child[parent]
+            self.first_child[parent] = i
+        return i
+
+    # ------------- consultas -------------
+    def children(self, i):
+        c = int(self.first_child[i])
+        while c >= 0:
+            yield c
+            c = int(self.next_sibling[c])
+
+    def board(self, i):
+        return BitBoard.from_key(int(self.key[i]))
+
+    def untried_actions(self, i):
+        m = int(self.untried[i])
+        return [a for a in range(COLS) if m & (1 << a)]
+
+
+class TranspositionTable:
+    """
+    Clave canónica de una posición -> índice en el NodePool del nodo que
+    guarda sus estadísticas, para que todos los órdenes de jugadas que
+    llegan a la misma posición (o a su reflejo) compartan N, W y resultado.
+
+    Es una tabla hash de direccionamiento abierto sobre dos arrays de NumPy
+    con el doble de casillas que nodos tiene el pool. Se sondean como mucho
+    MAX_PROBE casillas; si están todas ocupadas se expulsa la entrada con
+    menos visitas (su nodo sigue en el árbol, solo deja de compartirse).
+    Las entradas apuntan a índices del pool, así que se vacía con él.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+        log2 = max(4, (2 * pool.capacity - 1).bit_length())
+        self.shift = 64 - log2
+        self.mask = (1 << log2) - 1
+        self.keys = np.zeros(1 << log2, dtype=np.uint64)  # 0 = casilla vacía
+        self.index = np.zeros(1 << log2, dtype=np.int32)
+        self.evictions = 0
+
+    def clear(self):
+        self.keys[:] = 0
+
+    def slot(self, key):
+        return ((key * HASH_MULT) & MASK64) >> self.shift
+
+    def get(self, key):
+        """Índice del nodo de la posición `key` o -1 si no está."""
+        keys = self.keys
+        slot = self.slot(key)
+        for _ in range(MAX_PROBE):
+            k = int(keys[slot])
+            if k == key:
+                return int(self.index[slot])
+            if k == 0:
+                return -1
+            slot = (slot + 1) & self.mask
+        return -1
+
+    def put(self, key, i):
+        keys = self.keys
+        N = self.pool.N
+        slot = self.slot(key)
+        victim = -1
+        for _ in range(MAX_PROBE):
+            k = int(keys[slot])
+            if k == key or k == 0:
+                victim = slot
+                break
+            if victim < 0 or N[self.index[slot]] < N[self.index[victim]]:
+                victim = slot
+            slot = (slot + 1) & self.mask
+        else:
+            self.evictions += 1
+        keys[victim] = key
+        self.index[victim] = i
@@ -0,0 +1,709 @@
+import json
+import os
+import sys
+import threading
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from bitboard import HASH_MULT, MASK64, BitBoard, canonical_packed, pack_key
+
+
+# ---------------------------------
+# FORMATO DEL ARCHIVO
+# ---------------------------------
+# Cabecera de 16 bytes: magic, versión, log2(capacidad), número de entradas.
+# Después, una tabla hash de direccionamiento abierto (sondeo lineal) con
+# registros de 16 bytes. key == 0 marca una casilla vacía (ninguna clave
+# empaquetada de BitBoard vale 0).
+# Versión 2: las claves son canónicas respecto al reflejo horizontal. Los
+# archivos de la versión 1 se migran al abrirlos.
+MAGIC = b"C4QN"
+VERSION = 2
+HEADER = np.dtype([("magic", "S4"), ("version", "<u4"),
+                   ("log2", "<u4"), ("count", "<u4")])
+RECORD = np.dtype([("key", "<u8"), ("q", "<f4"), ("n", "<u4")])
+
+MIN_LOG2 = 16
+MAX_LOAD = 0.7
+
+
+def fit_log2(total, log2=MIN_LOG2):
+    log2 = max(MIN_LOG2, log2)
+    while total > MAX_LOAD * (1 << log2):
+        log2 += 1
+    return log2
+
+
+def merge_canonical(records):
+    """
+    Pasa las claves a su forma canónica y fusiona las entradas que caen en la
+    misma clave (N se suma, Q se promedia ponderado por N).
+    """
+    merged = {}
+    keys = [canonical_packed(k) for k in records["key"].tolist()]
+    for k, q, n in zip(keys, records["q"].tolist(), records["n"].tolist()):
+        if k in merged:
+            q0, n0 = merged[k]
+            total = n0 + n
+            merged[k] = ((q0 * n0 + q * n) / total if total else q0, total)
+        else:
+            merged[k] = (q, n)
+    return np.array([(k, q, n) for k, (q, n) in merged.items()], dtype=RECORD)
+
+
+def slot_of(key, log2):
+    return ((key * HASH_MULT) & MASK64) >> (64 - log2)
+
+
+def slots_of(keys, log2):
+    return (keys * np.uint64(HASH_MULT)) >> np.uint64(64 - log2)
+
+
+def build_table(records, log2):
+    """
+    Inserta `records` en una tabla nueva de 2**log2 casillas. El sondeo lineal
+    se hace por rondas vectorizadas: en cada ronda cada clave pendiente intenta
+    su casilla actual y, si no la consigue, avanza una posición.
+    """
+    cap = 1 << log2
+    table = np.zeros(cap, dtype=RECORD)
+    pending = np.arange(len(records))
+    pos = slots_of(records["key"], log2).astype(np.int64)
+
+    while pending.size:
+        slots = pos[pending]
+        free = table["key"][slots] == 0
+        cand = pending[free]
+        uniq, first = np.unique(slots[free], return_index=True)
+        winners = cand[first]
+        table[uniq] = records[winners]
+
+        placed = np.zeros(len(records), dtype=bool)
+        placed[winners] = True
+        pending = pending[~placed[pending]]
+        pos[pending] = (pos[pending] + 1) & (cap - 1)
+
+    return table
+
+
+class _Column:
+    """Vista tipo dict de un campo (q o n) del almacén."""
+
+    def __init__(self, store, field):
+        self.store = store
+        self.field = field
+
+    def get(self, key, default=None):
+        entry = self.store.lookup(key)
+        return default if entry is None else entry[self.field]
+
+    def __getitem__(self, key):
+        entry = self.store.lookup(key)
+        if entry is None:
+            raise KeyError(key)
+        return entry[self.field]
+
+    def __setitem__(self, key, value):
+        self.store.set(key, self.field, value)
+
+    def __contains__(self, key):
+        return self.store.lookup(key) is not None
+
+    def __len__(self):
+        return len(self.store)
+
+
+class FileLock:
+    """Cerrojo exclusivo entre procesos sobre un archivo auxiliar."""
+
+    def __init__(self, path):
+        self.path = path
+        self.f = None
+
+    def __enter__(self):
+        self.f = open(self.path, "a+b")
+        if fcntl is not None:
+            fcntl.flock(self.f, fcntl.LOCK_EX)
+        else:
+            self.f.seek(0)
+            msvcrt.locking(self.f.fileno(), msvcrt.LK_LOCK, 1)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self.f, fcntl.LOCK_UN)
+        else:
+            self.f.seek(0)
+            msvcrt.locking(self.f.fileno(), msvcrt.LK_UNLCK, 1)
+        self.f.close()
+        self.f = None
+
+
+class QNStore:
+    """
+    Tablas Q/N globales guardadas en un archivo binario abierto con np.memmap.
+
+    Abrir el archivo no lee su contenido: cada búsqueda sondea solo las
+    casillas necesarias y guarda el resultado en una caché en memoria.
+
+    No se sobrescriben valores: take_deltas() calcula para cada entrada
+    modificada el delta respecto a lo que se leyó (visitas nuevas y suma de
+    recompensas) y merge() lo mezcla con lo que haya en el archivo en ese
+    momento, bajo un cerrojo de archivo. Así varios procesos pueden aprender a la vez sin que el
+    último en escribir borre lo de los demás.
+    """
+
+    def __init__(self, path, entries=None):
+        self.path = path
+        self.lock_path = path + ".lock"
+        # clave -> [q, n] leídas o modificadas (se puede compartir entre shards)
+        self.entries = entries if entries is not None else {}
+        self.base = {}      # clave -> (q, n) tal como estaban en el archivo
+        self.dirty = set()
+        self.new = set()    # claves creadas aquí que no estaban en el archivo
+        self.table = None
+        self.log2 = 0
+        self.count = 0
+        self.ino = None
+        self.hits = 0
+        self.misses = 0
+        # True si el archivo pudo cambiar (compactación) desde que se abrió
+        self.stale = False
+
+        if os.path.exists(path):
+            with FileLock(self.lock_path):
+                self._open()
+                if self.version == 1:
+                    records = merge_canonical(self._records())
+                    self._write(records, fit_log2(len(records)))
+
+        self.Q = _Column(self, 0)
+        self.N = _Column(self, 1)
+
+    def __len__(self):
+        self._sync()
+        return self.count + len(self.new)
+
+    def _open(self):
+        header = np.fromfile(self.path, dtype=HEADER, count=1)[0]
+        if header["magic"] != MAGIC or header["version"] not in (1, VERSION):
+            raise ValueError(f"{self.path} no es un archivo de Q/N válido")
+        self.version = int(header["version"])
+        self.log2 = int(header["log2"])
+        self.count = int(header["count"])
+        self.ino = os.stat(self.path).st_ino
+        self.table = np.memmap(self.path, dtype=RECORD, mode="r+",
+                               offset=HEADER.itemsize,
+                               shape=(1 << self.log2,))
+
+    def _refresh(self):
+        """Vuelve a abrir el archivo si otro proceso lo reescribió o lo creó."""
+        if not os.path.exists(self.path):
+            return
+        if self.table is None or os.stat(self.path).st_ino != self.ino:
+            self.table = None
+            self._open()
+        else:
+            header = np.fromfile(self.path, dtype=HEADER, count=1)[0]
+            self.count = int(header["count"])
+
+    def _sync(self):
+        """Vuelve a abrir el archivo si una compactación pudo cambiarlo."""
+        if not self.stale:
+            return
+        self.stale = False
+        self._refresh()
+        # lo creado aquí que la compactación ya escribió deja de ser nuevo
+        self.new = {k for k in self.new if self._probe(k) < 0}
+
+    # ------------- acceso -------------
+    def _probe(self, key):
+        """Casilla de `key` en el archivo, o -1 si no está."""
+        if self.table is None:
+            return -1
+        keys = self.table["key"]
+        mask = (1 << self.log2) - 1
+        slot = slot_of(key, self.log2)
+        while True:
+            k = int(keys[slot])
+            if k == key:
+                return slot
+            if k == 0:
+                return -1
+            slot = (slot + 1) & mask
+
+    def lookup(self, key):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        self._sync()
+        slot = self._probe(key)
+        if slot < 0:
+            return None
+        rec = self.table[slot]
+        entry = [float(rec["q"]), int(rec["n"])]
+        self.entries[key] = entry
+        self.base[key] = tuple(entry)
+        return entry
+
+    def _entry(self, key):
+        """Entrada de `key` para modificarla (se crea si no existe)."""
+        entry = self.lookup(key)
+        if entry is None:
+            entry = [0.0, 0]
+            self.entries[key] = entry
+            self.base[key] = (0.0, 0)
+            self.new.add(key)
+        self.dirty.add(key)
+        return entry
+
+    def set(self, key, field, value):
+        self._entry(key)[field] = value
+
+    def visit(self, key, reward):
+        """Suma una visita a `key` y actualiza su media con `reward`."""
+        entry = self._entry(key)
+        entry[1] += 1
+        entry[0] += (reward - entry[0]) / entry[1]
+
+    # ------------- escritura -------------
+    def _write_header(self):
+        header = np.array([(MAGIC, VERSION, self.log2, self.count)], dtype=HEADER)
+        with open(self.path, "r+b") as f:
+            f.write(header.tobytes())
+
+    def _records(self):
+        if self.table is None:
+            return np.zeros(0, dtype=RECORD)
+        old = np.asarray(self.table)
+        return old[old["key"] != 0]
+
+    def _write(self, records, log2):
+        """Reescribe el archivo completo con capacidad 2**log2."""
+        table = build_table(records, log2)
+
+        tmp = self.path + ".tmp"
+        header = np.array([(MAGIC, VERSION, log2, len(records))], dtype=HEADER)
+        with open(tmp, "wb") as f:
+            f.write(header.tobytes())
+            f.write(table.tobytes())
+        self.table = None
+        os.replace(tmp, self.path)
+        self._open()
+
+    def take_deltas(self):
+        """
+        Devuelve {clave: (suma de recompensas, visitas)} acumulado desde el
+        último volcado y da esas actualizaciones por guardadas.
+        """
+        deltas = {}
+        for key in self.dirty:
+            q, n = self.entries[key]
+            q0, n0 = self.base[key]
+            if n != n0 or q != q0:
+                deltas[key] = (q * n - q0 * n0, n - n0)
+            self.base[key] = (q, n)
+        self.dirty.clear()
+        return deltas
+
+    def merge(self, deltas):
+        """Suma `deltas` a lo que haya en el archivo, bajo el cerrojo."""
+        if not deltas:
+            return
+
+        with FileLock(self.lock_path):
+            self._refresh()
+
+            merged = {}
+            fresh = []
+            for key, (dsum, dn) in deltas.items():
+                slot = self._probe(key)
+                if slot >= 0:
+                    rec = self.table[slot]
+                    qs, ns = float(rec["q"]), int(rec["n"])
+                else:
+                    qs, ns = 0.0, 0
+                    fresh.append(key)
+
+                total = ns + dn
+                merged[key] = ((qs * ns + dsum) / total if total > 0 else qs, total)
+
+            total = self.count + len(fresh)
+            if self.table is None or total > MAX_LOAD * (1 << self.log2):
+                grown = np.array([(k, *merged[k]) for k in fresh], dtype=RECORD)
+                self._write(np.concatenate([self._records(), grown]),
+                            fit_log2(total, self.log2))
+
+            keys = self.table["key"]
+            mask = (1 << self.log2) - 1
+            for key, (q, n) in merged.items():
+                slot = slot_of(key, self.log2)
+                while True:
+                    k = int(keys[slot])
+                    if k == key or k == 0:
+                        break
+                    slot = (slot + 1) & mask
+                if k == 0:
+                    self.count += 1
+                self.table[slot] = (key, q, n)
+
+                if key not in self.dirty:
+                    self.entries[key] = [q, n]
+                    self.base[key] = (q, n)
+
+            self.table.flush()
+            self._write_header()
+
+        self.new.difference_update(merged)
+
+
+# ---------------------------------
+# DIARIO DE ACTUALIZACIONES
+# ---------------------------------
+# Registros de 20 bytes añadidos al final de journal.log: clave, suma de
+# recompensas y visitas nuevas. Un registro cortado a medias por una caída
+# se descarta al leer.
+DELTA = np.dtype([("key", "<u8"), ("dsum", "<f8"), ("dn", "<u4")])
+
+COMPACT_BYTES = 1 << 20
+EVICT_KEEP = 0.75  # fracción de `capacity` que queda en memoria tras trim()
+
+
+def read_deltas(path):
+    """Lee un diario y agrupa sus registros por clave."""
+    raw = np.fromfile(path, dtype=np.uint8)
+    records = raw[:len(raw) - len(raw) % DELTA.itemsize].view(DELTA)
+
+    deltas = {}
+    for key, dsum, dn in records.tolist():
+        s, n = deltas.get(key, (0.0, 0))
+        deltas[key] = (s + dsum, n + dn)
+    return deltas
+
+
+class ShardedStore:
+    """
+    Tablas Q/N repartidas por clave entre varios QNStore, cada uno con su
+    archivo y su cerrojo.
+
+    flush() no toca los shards: añade los deltas nuevos al final de
+    journal.log, así que su coste depende de cuánto se ha aprendido desde el
+    último flush() y no del tamaño de las tablas. Cuando el diario crece, un
+    hilo en segundo plano lo pliega en los shards (compact()); al abrir el
+    almacén se pliega lo que haya quedado pendiente, por ejemplo tras una
+    caída.
+
+    En memoria solo se guardan `capacity` entradas como mucho (None = sin
+    límite): trim() vuelca lo pendiente y descarta las entradas con menos
+    visitas, que se vuelven a leer del disco si hacen falta.
+
+    Si `directory` no existe, no se crea al abrir: el almacén vive solo en
+    memoria hasta el primer flush().
+    """
+
+    def __init__(self, directory, shards=8, capacity=None):
+        meta = os.path.join(directory, "meta.json")
+        self.created = os.path.exists(meta)
+        if self.created:
+            with FileLock(os.path.join(directory, "meta.lock")):
+                with open(meta, "r") as f:
+                    shards = json.load(f)["shards"]
+
+        self.directory = directory
+        self.journal = os.path.join(directory, "journal.log")
+        self.compactor = None
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.shard_count = shards
+        self.shards = []
+        self.imported = None  # registros importados aún sin escribir
+
+        self.compact()
+
+        self.entries = {}
+        self.shards = [
+            QNStore(path, self.entries) for path in self.shard_paths()
+        ]
+        self.Q = _Column(self, 0)
+        self.N = _Column(self, 1)
+
+    def __len__(self):
+        return sum(len(s) for s in self.shards)
+
+    def shard_paths(self):
+        return [os.path.join(self.directory, f"shard_{i:02d}.bin")
+                for i in range(self.shard_count)]
+
+    def _create(self):
+        """
+        Crea el directorio y meta.json al escribir por primera vez. Si otro
+        proceso lo creó antes con otro número de shards, las vistas se
+        rehacen con el suyo (no hay nada pendiente: flush() ya tomó los
+        deltas).
+        return: True si meta.json lo ha creado este proceso.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        meta = os.path.join(self.directory, "meta.json")
+        with FileLock(os.path.join(self.directory, "meta.lock")):
+            if os.path.exists(meta):
+                with open(meta, "r") as f:
+                    shards = json.load(f)["shards"]
+            else:
+                shards = None
+                with open(meta, "w") as f:
+                    json.dump({"version": VERSION,
+                               "shards": self.shard_count}, f)
+        self.created = True
+        if shards is None or shards == self.shard_count:
+            return shards is None
+
+        self.shard_count = shards
+        self.shards = [
+            QNStore(path, self.entries) for path in self.shard_paths()
+        ]
+        for key, entry in self.entries.items():
+            shard = self.shards[self.shard_index(key)]
+            shard.base[key] = tuple(entry)
+            shard.new.add(key)
+        for shard in self.shards:
+            shard.stale = True
+        return False
+
+    def shard_index(self, key):
+        return slot_of(key, 32) % len(self.shards)
+
+    def lookup(self, key):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return self.shards[self.shard_index(key)].lookup(key)
+
+    def set(self, key, field, value):
+        self.shards[self.shard_index(key)].set(key, field, value)
+
+    def update(self, rewards):
+        """
+        Aplica de una vez una lista de (clave, recompensa): una visita más
+        por elemento, en orden, como haría la retropropagación clave a clave.
+        """
+        shards = self.shards
+        for key, reward in rewards:
+            shards[slot_of(key, 32) % len(shards)].visit(key, reward)
+
+    def add_records(self, records):
+        """Suma `records` (ya canónicos) a lo que haya en el almacén."""
+        for key, q, n in records.tolist():
+            entry = self.lookup(key) or [0.0, 0]
+            total = entry[1] + n
+            self.set(key, 0, (entry[0] * entry[1] + q * n) / total if total else q)
+            self.set(key, 1, total)
+        if not self.created:
+            # se escriben con el primer flush(), y solo si es este proceso
+            # el que crea el almacén (si no, otro ya los importó)
+            self.imported = records
+            for shard in self.shards:
+                shard.take_deltas()
+            return
+        self.flush()
+        self.join()
+        self.compact()
+
+    # ------------- límite de memoria -------------
+    def trim(self):
+        """
+        Si hay más de `capacity` entradas en memoria, vuelca lo pendiente,
+        pliega el diario en los shards (si no, lo descartado no se podría
+        volver a leer) y descarta las de menos visitas hasta dejar
+        EVICT_KEEP * capacity.
+        Solo debe llamarse entre búsquedas, nunca a mitad de una
+        actualización de Q/N.
+        """
+        if self.capacity is None or len(self.entries) <= self.capacity:
+            return 0
+
+        self.flush()
+        self.join()
+        self.compact()
+        keys = list(self.entries)
+        visits = np.fromiter((e[1] for e in self.entries.values()),
+                             dtype=np.int64, count=len(keys))
+        drop = len(keys) - int(EVICT_KEEP * self.capacity)
+        for i in np.argpartition(visits, drop - 1)[:drop].tolist():
+            key = keys[i]
+            del self.entries[key]
+            shard = self.shards[self.shard_index(key)]
+            shard.base.pop(key, None)
+            shard.new.discard(key)
+
+        self.evictions += drop
+        return drop
+
+    def stats(self):
+        """Contadores para ajustar `capacity`."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    # ------------- diario -------------
+    def flush(self):
+        deltas = {}
+        for shard in self.shards:
+            deltas.update(shard.take_deltas())
+        if not deltas and self.imported is None:
+            return
+
+        records = np.array(
+            [(k, s, n) for k, (s, n) in deltas.items()], dtype=DELTA
+        )
+        if not self.created and self._create() and self.imported is not None:
+            imported = self.imported
+            records = np.concatenate([records, np.array(
+                list(zip(imported["key"].tolist(),
+                         (imported["q"] * imported["n"]).tolist(),
+                         imported["n"].tolist())), dtype=DELTA)])
+        self.imported = None
+        with FileLock(self.journal + ".lock"):
+            with open(self.journal, "ab") as f:
+                f.write(records.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            size = os.path.getsize(self.journal)
+
+        if size > COMPACT_BYTES and not self.compacting():
+            self.compactor = threading.Thread(target=self.compact, daemon=True)
+            self.compactor.start()
+
+    def compacting(self):
+        return self.compactor is not None and self.compactor.is_alive()
+
+    def join(self):
+        """Espera a que termine la compactación en curso, si la hay."""
+        if self.compactor is not None:
+            self.compactor.join()
+            self.compactor = None
+
+    def compact(self):
+        """
+        Pliega el diario en los shards. journal.log se renombra primero a
+        journal.fold, de modo que los demás procesos siguen escribiendo en un
+        diario nuevo; journal.done apunta los shards ya actualizados para que
+        una compactación interrumpida no sume dos veces el mismo delta.
+        """
+        if not self.created:
+            return
+        fold = os.path.join(self.directory, "journal.fold")
+        done = os.path.join(self.directory, "journal.done")
+
+        with FileLock(os.path.join(self.directory, "compact.lock")):
+            if not os.path.exists(fold):
+                with FileLock(self.journal + ".lock"):
+                    if not os.path.exists(self.journal):
+                        return
+                    os.replace(self.journal, fold)
+                if os.path.exists(done):
+                    os.remove(done)
+
+            skip = set()
+            if os.path.exists(done):
+                with open(done, "r") as f:
+                    skip = {int(line) for line in f if line.strip()}
+
+            paths = self.shard_paths()
+            groups = [{} for _ in paths]
+            for key, delta in read_deltas(fold).items():
+                groups[slot_of(key, 32) % len(paths)][key] = delta
+
+            for i, (path, deltas) in enumerate(zip(paths, groups)):
+                if i in skip:
+                    continue
+                QNStore(path).merge(deltas)
+                with open(done, "a") as f:
+                    f.write(f"{i}\n")
+
+            os.remove(fold)
+            os.remove(done)
+
+        # la compactación escribe con instancias propias: las vistas vivas
+        # vuelven a abrir su archivo (creado o reescrito) en el siguiente
+        # fallo de caché
+        for shard in self.shards:
+            shard.stale = True
+
+
+def open_store(directory, legacy_bin=None, legacy_json=None, shards=8,
+               capacity=None):
+    """
+    Abre el almacén compartido de `directory`. Si aún no existe importa las
+    tablas de un q_values.bin o q_values.json anterior, si los hay; quedan
+    en memoria y se escriben en `directory` con el primer flush().
+    """
+    store = ShardedStore(directory, shards, capacity)
+    if store.created:
+        return store
+
+    if legacy_bin is not None and os.path.exists(legacy_bin):
+        store.add_records(QNStore(legacy_bin)._records())
+    elif legacy_json is not None and os.path.exists(legacy_json):
+        store.add_records(json_records(legacy_json))
+    return store
+
+
+# ---------------------------------
+# CONVERSIÓN DESDE q_values.json
+# ---------------------------------
+def parse_json_key(k):
+    """
+    Clave de q_values.json -> clave empaquetada de BitBoard. Acepta tanto
+    enteros como el formato antiguo str((tuple(board.flatten()), action)).
+    """
+    if not k.startswith("("):
+        return int(k)
+    cells, action = eval(k, {"np": np})
+    board = BitBoard.from_array(np.array(cells, dtype=int).reshape(6, 7))
+    return pack_key(board.key, int(action))
+
+
+def json_records(json_path):
+    with open(json_path, "r") as f:
+        data = json.load(f)
+
+    Q = {parse_json_key(k): v for k, v in data.get("Q", {}).items()}
+    N = {parse_json_key(k): v for k, v in data.get("N", {}).items()}
+    records = np.array(
+        [(k, Q.get(k, 0.0), N.get(k, 0)) for k in Q.keys() | N.keys()],
+        dtype=RECORD
+    )
+    return merge_canonical(records)
+
+
+def convert_json(json_path, store_path):
+    records = json_records(json_path)
+    store = QNStore(store_path)
+    with FileLock(store.lock_path):
+        store._write(records, fit_log2(len(records)))
+    return store
+
+
+if __name__ == "__main__":
+    src = sys.argv[1] if len(sys.argv) > 1 else "q_values.json"
+    dst = sys.argv[2] if len(sys.argv) > 2 else "q_values.bin"
+    store = convert_json(src, dst)
+    print(f"{len(store)} entradas convertidas: {src} -> {dst}")
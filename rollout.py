@@ -0,0 +1,112 @@
+import numpy as np
+
+from bitboard import (
+    BOTTOM, BOARD_MASK, COLS, COLUMN_LIMIT, COLUMN_MASKS, winning_cells
+)
+
+
+LIMITS = np.array(COLUMN_LIMIT, dtype=np.int64)
+ONE = np.uint64(1)
+CENTER = COLUMN_MASKS[3]
+
+
+def simulate_one(board, player, rng):
+    """
+    Una partida aleatoria desde (board, player), sin modificar `board`:
+        1) si el jugador al turno puede ganar, gana;
+        2) si el rival amenaza ganar, la partida se cuenta para el jugador
+           al turno;
+        3) si no, centro y si no está libre una columna al azar.
+
+    Cada jugador lleva su mapa de amenazas (casillas vacías que le darían
+    cuatro en línea). Al jugar solo se recalcula el del que mueve; al rival
+    basta con quitarle la casilla ocupada. Así 1) y 2) son un AND con las
+    casillas jugables, y como 1) descarta las jugadas ganadoras, la jugada
+    de 3) nunca gana.
+
+    return: ganador (1, -1 o 0 para empate).
+    """
+    own = board.red if player == 1 else board.yellow
+    mask = board.red | board.yellow
+    own_threats = winning_cells(own, mask)
+    opp_threats = winning_cells(own ^ mask, mask)
+
+    while True:
+        legal = (mask + BOTTOM) & BOARD_MASK
+        if not legal:
+            return 0
+
+        if own_threats & legal or opp_threats & legal:
+            return player
+
+        if legal & CENTER:
+            move = legal & CENTER
+        else:
+            actions = [c for c in range(COLS) if legal & COLUMN_MASKS[c]]
+            move = legal & COLUMN_MASKS[int(rng.choice(actions))]
+
+        opp = own ^ mask
+        own |= move
+        mask |= move
+        own_threats = winning_cells(own, mask)
+        opp_threats &= ~move
+
+        own, own_threats, opp_threats = opp, opp_threats, own_threats
+        player = -player
+
+
+def simulate_batch(boards, players, rng):
+    """
+    Juega B partidas aleatorias a la vez, una por cada (BitBoard, jugador),
+    con la misma política que `simulate_one()`.
+    Todas las partidas avanzan a la vez con operaciones sobre arrays:
+    máscaras uint64 para las fichas y un array (B, 7) de alturas.
+
+    return: array de ganadores (1, -1 o 0 para empate).
+    """
+    B = len(boards)
+    red = np.array([b.red for b in boards], dtype=np.uint64)
+    yellow = np.array([b.yellow for b in boards], dtype=np.uint64)
+    heights = np.array([b.heights for b in boards], dtype=np.int64)
+    player = np.array(players, dtype=np.int64)
+
+    winner = np.zeros(B, dtype=np.int64)
+    active = np.arange(B)
+
+    while active.size:
+        r = red[active]
+        y = yellow[active]
+        p = player[active]
+        mask = r | y
+        legal = (mask + np.uint64(BOTTOM)) & np.uint64(BOARD_MASK)
+
+        own = np.where(p == 1, r, y)
+        opp = np.where(p == 1, y, r)
+        win_now = (winning_cells(own, mask) & legal) != 0
+        threat = (winning_cells(opp, mask) & legal) != 0
+
+        full = legal == 0
+        ends = full | win_now | threat
+        winner[active[~full & ends]] = p[~full & ends]
+
+        keep = ~ends
+        active = active[keep]
+        if not active.size:
+            break
+        p = p[keep]
+
+        # 3) centro o columna legal al azar
+        h = heights[active]
+        can = h < LIMITS
+        noise = rng.random_sample((active.size, COLS)) * can
+        chosen = np.where(can[:, 3], 3, np.argmax(noise, axis=1))
+
+        rows = np.arange(active.size)
+        bit = ONE << h[rows, chosen].astype(np.uint64)
+        is_red = p == 1
+        red[active[is_red]] |= bit[is_red]
+        yellow[active[~is_red]] |= bit[~is_red]
+        heights[active, chosen] += 1
+        player[active] = -p
+
+    return winner
@@ -0,0 +1,105 @@
+import multiprocessing as mp
+
+from bitboard import BitBoard, COLS
+from qstore import ShardedStore
+from seeding import random_state, sequence
+
+
+def _worker(conn, mcts_class, q_dir, seed, capacity, mcts_kwargs):
+    """
+    Bucle de un proceso de búsqueda. Mantiene su propio árbol (y por tanto
+    reutiliza subárboles entre jugadas) y aprende sobre las mismas tablas
+    globales que la política; al cerrarse vuelca sus deltas al almacén.
+    """
+    store = ShardedStore(q_dir, capacity=capacity)
+    mcts = mcts_class(
+        s0=BitBoard(),
+        main_player=-1,
+        rng=random_state(seed),
+        store=store,
+        **mcts_kwargs
+    )
+
+    while True:
+        msg = conn.recv()
+        if msg is None:
+            break
+
+        board, player, time_limit = msg
+        mcts.main_player = player
+        mcts.advance_root(board, player)
+        mcts.run(time_limit=time_limit)
+
+        # estadísticas de los hijos de la raíz, en la orientación de `board`
+        stats = {}
+        for a, (n, w) in mcts.root_stats().items():
+            if mcts.flipped:
+                a = COLS - 1 - a
+            stats[a] = (n, w)
+        conn.send(stats)
+
+        # el recorte va después de responder, mientras juega el rival, para
+        # no quitarle tiempo a la jugada
+        store.trim()
+
+    store.flush()
+    store.join()
+    conn.close()
+
+
+class RootParallelSearch:
+    """
+    MCTS paralelo en la raíz: `workers` procesos buscan de forma independiente
+    desde la misma posición, cada uno con su propio flujo aleatorio
+    (seeding.random_state(seed, índice del proceso)), durante el mismo
+    time_limit. Al terminar se suman las visitas y valores de los hijos de la
+    raíz. Los procesos se crean una sola vez y se reutilizan entre jugadas.
+    """
+
+    def __init__(self, workers, mcts_class, q_dir, seed=None, capacity=None,
+                 **mcts_kwargs):
+        method = "fork" if "fork" in mp.get_all_start_methods() else "spawn"
+        ctx = mp.get_context(method)
+
+        self.conns = []
+        self.procs = []
+        for w in range(workers):
+            parent_conn, child_conn = ctx.Pipe()
+            proc = ctx.Process(
+                target=_worker,
+                args=(child_conn, mcts_class, q_dir, sequence(seed, w),
+                      capacity, mcts_kwargs),
+                daemon=True
+            )
+            proc.start()
+            child_conn.close()
+            self.conns.append(parent_conn)
+            self.procs.append(proc)
+
+    def search(self, board, player, time_limit=0.05):
+        """return: dict acción -> [N, W] sumados sobre todos los procesos."""
+        for conn in self.conns:
+            conn.send((board, player, time_limit))
+
+        totals = {}
+        for conn in self.conns:
+            for a, (n, w) in conn.recv().items():
+                t = totals.setdefault(a, [0, 0.0])
+                t[0] += n
+                t[1] += w
+        return totals
+
+    def close(self):
+        for conn in self.conns:
+            try:
+                conn.send(None)
+                conn.close()
+            except OSError:
+                pass
+        # margen para que cada proceso vuelque sus deltas
+        for proc in self.procs:
+            proc.join(timeout=10)
+            if proc.is_alive():
+                proc.terminate()
+        self.conns = []
+        self.procs = []
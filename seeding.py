@@ -0,0 +1,35 @@
+import numpy as np
+
+
+# ---------------------------------
+# FLUJOS ALEATORIOS REPRODUCIBLES
+# ---------------------------------
+# Cada flujo es un Philox (generador basado en contador) cuya clave se deriva
+# de una semilla y un camino de enteros, por ejemplo (partida, proceso).
+# Flujos con caminos distintos son independientes y no dependen del orden en
+# que se crean, así que una partida o un proceso reproduce siempre lo mismo
+# aunque cambie cuántos se lanzan o en qué orden terminan.
+# Con seed=None la clave sale de la entropía del sistema.
+
+
+def sequence(seed, *path):
+    """SeedSequence de `seed` (entero, None o SeedSequence) y `path`."""
+    if isinstance(seed, np.random.SeedSequence):
+        return np.random.SeedSequence(seed.entropy,
+                                      spawn_key=seed.spawn_key + path)
+    return np.random.SeedSequence(seed, spawn_key=path)
+
+
+def philox(seed, *path):
+    key = sequence(seed, *path).generate_state(2, np.uint64)
+    return np.random.Philox(key=key)
+
+
+def random_state(seed, *path):
+    """Flujo con la interfaz de np.random.RandomState (la que usa el MCTS)."""
+    return np.random.RandomState(philox(seed, *path))
+
+
+def generator(seed, *path):
+    """Flujo con la interfaz de np.random.Generator."""
+    return np.random.Generator(philox(seed, *path))
@@ -0,0 +1,151 @@
+import time
+
+from bitboard import (
+    BOARD_MASK, BOTTOM, CELLS, CENTER_ORDER, COLUMN_MASKS, winning_cells
+)
+
+
+EXACT, LOWER, UPPER = 0, 1, 2
+
+
+class _OutOfBudget(Exception):
+    pass
+
+
+def win_score(moves):
+    """Puntuación de ganar con la siguiente ficha cuando ya hay `moves`."""
+    return (CELLS + 1 - moves) // 2
+
+
+class Solver:
+    """
+    Negamax con poda alfa-beta sobre máscaras de bits, para finales.
+
+    La posición se representa como (current, mask): fichas del jugador al
+    turno y todas las fichas. Ganar antes puntúa más (win_score), el empate
+    vale 0 y una posición sin resolver al llegar al límite de profundidad
+    también vale 0. Por eso un resultado distinto de 0 es siempre una
+    victoria o derrota demostrada, y un 0 solo es un empate demostrado si la
+    búsqueda llegó hasta el final del tablero.
+
+    solve() profundiza de forma iterativa hasta demostrar el resultado o
+    agotar el presupuesto de nodos o de tiempo. La tabla de transposición
+    se conserva entre llamadas.
+    """
+
+    def __init__(self, tt_capacity=1_000_000):
+        self.tt_capacity = tt_capacity
+        self.table = {}
+        self.nodes = 0
+
+    # ------------- búsqueda -------------
+    def negamax(self, current, mask, moves, depth, alpha, beta):
+        self.nodes += 1
+        if self.nodes > self.max_nodes or (
+            self.nodes & 1023 == 0 and time.monotonic() > self.deadline
+        ):
+            raise _OutOfBudget
+
+        possible = (mask + BOTTOM) & BOARD_MASK
+        if winning_cells(current, mask) & possible:
+            return win_score(moves)
+
+        # jugadas que no pierden enseguida: si el rival amenaza, hay que
+        # tapar; y nunca jugar justo debajo de una casilla ganadora suya
+        opp = current ^ mask
+        opp_wins = winning_cells(opp, mask)
+        forced = opp_wins & possible
+        if forced:
+            if forced & (forced - 1):
+                return -win_score(moves + 1)
+            possible = forced
+        possible &= ~(opp_wins >> 1)
+        if not possible:
+            return -win_score(moves + 1)
+
+        if moves >= CELLS - 2:
+            return 0
+        if depth == 0:
+            return 0
+
+        key = current + mask
+        entry = self.table.get(key)
+        if entry is not None and entry[0] >= depth:
+            _, flag, value = entry
+            if flag == EXACT:
+                return value
+            if flag == LOWER:
+                alpha = max(alpha, value)
+            else:
+                beta = min(beta, value)
+            if alpha >= beta:
+                return value
+
+        alpha0 = alpha
+        best = -CELLS
+        for c in CENTER_ORDER:
+            move = possible & COLUMN_MASKS[c]
+            if not move:
+                continue
+            score = -self.negamax(opp, mask | move, moves + 1, depth - 1,
+                                  -beta, -alpha)
+            if score > best:
+                best = score
+            if score > alpha:
+                alpha = score
+                if alpha >= beta:
+                    break
+
+        if len(self.table) >= self.tt_capacity:
+            self.table.clear()
+        flag = UPPER if best <= alpha0 else LOWER if best >= beta else EXACT
+        self.table[key] = (depth, flag, best)
+        return best
+
+    def search_root(self, current, mask, moves, depth):
+        """return: (puntuación, mejor columna) a profundidad `depth`."""
+        possible = (mask + BOTTOM) & BOARD_MASK
+        best, best_col = -CELLS, None
+        alpha = -CELLS
+        for c in CENTER_ORDER:
+            move = possible & COLUMN_MASKS[c]
+            if not move:
+                continue
+            if winning_cells(current, mask) & move:
+                return win_score(moves), c
+            score = -self.negamax(current ^ mask, mask | move, moves + 1,
+                                  depth - 1, -CELLS, -alpha)
+            if score > best:
+                best, best_col = score, c
+                alpha = max(alpha, score)
+        return best, best_col
+
+    def solve(self, board, player, max_nodes=None, time_limit=None):
+        """
+        Resuelve (board, player) dentro del presupuesto.
+
+        return: (resultado, columna) con resultado 1 si gana el jugador al
+        turno, -1 si pierde y 0 si es empate; o None si no se demostró nada.
+        """
+        self.nodes = 0
+        self.max_nodes = max_nodes if max_nodes is not None else float("inf")
+        self.deadline = (
+            time.monotonic() + time_limit if time_limit is not None
+            else float("inf")
+        )
+
+        current = board.red if player == 1 else board.yellow
+        mask = board.red | board.yellow
+        moves = board.moves
+        empty = CELLS - moves
+        if empty == 0:
+            return None
+
+        try:
+            for depth in range(1, empty + 1):
+                score, col = self.search_root(current, mask, moves, depth)
+                if score != 0 or depth == empty:
+                    return (score > 0) - (score < 0), col
+        except _OutOfBudget:
+            pass
+        return None
@@ -0,0 +1,46 @@
+from bitboard import BitBoard
+from MyPolicy import MyPolicy
+from seeding import random_state
+
+
+def random_positions(count, seed=0):
+    """
+    Tableros (arrays 6x7) con entre 6 y 20 fichas jugadas al azar en los que
+    MyPolicy tiene que buscar: nadie ha ganado, ningún jugador gana en una
+    jugada (ni ganar ni bloquear resuelve la jugada) y quedan demasiadas
+    casillas para el solver y demasiadas fichas para el libro.
+    """
+    rng = random_state(seed)
+    boards = []
+    while len(boards) < count:
+        board = BitBoard()
+        player = 1
+        for _ in range(rng.randint(6, 21)):
+            a = int(rng.choice(board.legal_actions()))
+            board.play(a, player)
+            if board.has_won(player):
+                break
+            player = -player
+        else:
+            legal = board.legal_actions()
+            if len(legal) > 1 and not any(
+                board.is_winning_move(a, p) for a in legal for p in (1, -1)
+            ):
+                boards.append(board.to_array())
+    return boards
+
+
+def fresh_policy(tmp_path, name):
+    policy = MyPolicy(iterations=200, q_dir=str(tmp_path / name))
+    policy.seed(1)
+    policy.mount()
+    return policy
+
+
+def test_mirrored_positions_get_mirrored_moves(tmp_path):
+    for i, s in enumerate(random_positions(16)):
+        # políticas nuevas para que ni el árbol ni las tablas Q/N de una
+        # búsqueda influyan en la otra
+        a = fresh_policy(tmp_path, f"a{i}").act(s.copy())
+        b = fresh_policy(tmp_path, f"b{i}").act(s[:, ::-1].copy())
+        assert a == 6 - b
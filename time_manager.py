@@ -0,0 +1,77 @@
+import numpy as np
+
+from bitboard import CELLS
+
+
+MIN_MOVES_LEFT = 4     # nunca se reparte el reloj entre menos jugadas
+RESERVE = 0.05         # fracción del reloj de partida que no se gasta
+GAP_LOW = 0.15         # ventaja de visitas (sobre el total) que se considera ajustada
+VALUE_SPREAD = 0.25    # desviación de los valores de la raíz que se considera alta
+
+
+class TimeManager:
+    """
+    Reparte el tiempo de búsqueda a lo largo de una partida.
+
+    Con `game_time` (segundos para toda la partida) el tiempo base de cada
+    jugada es lo que queda del reloj dividido entre las jugadas propias que
+    pueden quedar; las jugadas que no buscan (forzadas, de libro, resueltas)
+    apenas gastan y su tiempo pasa a las siguientes. Sin `game_time` cada
+    jugada tiene `move_time` segundos como tope, contando lo que ya se gastó
+    en la jugada antes de buscar (el solver).
+
+    Con `game_time`, tras la búsqueda base extension() concede tiempo extra,
+    hasta `max_factor` veces el base, si la raíz sigue indecisa: la jugada
+    más visitada apenas saca ventaja a la segunda o los valores de las
+    jugadas están muy repartidos.
+
+    La política llama a start_game() desde mount() y a spend() al terminar
+    cada jugada, así el reloj se arrastra de una jugada a la siguiente.
+    """
+
+    def __init__(self, game_time=None, move_time=0.05, max_factor=3.0,
+                 min_time=0.002):
+        self.game_time = game_time
+        self.move_time = move_time
+        self.max_factor = max_factor
+        self.min_time = min_time
+        self.start_game()
+
+    def start_game(self):
+        self.remaining = self.game_time
+
+    def allocate(self, board, spent=0.0):
+        """
+        Tiempo base para buscar en `board`.
+        spent: segundos ya gastados en esta jugada, que se descuentan.
+        """
+        if self.game_time is None:
+            return max(self.min_time, self.move_time - spent)
+        moves_left = max(MIN_MOVES_LEFT, (CELLS - board.moves + 1) // 2)
+        usable = self.remaining - RESERVE * self.game_time
+        return max(self.min_time, usable / moves_left - spent)
+
+    def extension(self, visits, values, base):
+        """
+        Segundos extra según la incertidumbre de la raíz. Sin `game_time`
+        no hay: `move_time` es el tope de la jugada.
+        visits, values: visitas y valores de las jugadas de la raíz.
+        """
+        total = sum(visits)
+        if self.game_time is None or len(visits) < 2 or total == 0:
+            return 0.0
+
+        first, second = sorted(visits, reverse=True)[:2]
+        factor = 0.0
+        if (first - second) / total < GAP_LOW:
+            factor += 1.0
+        if np.std(values) > VALUE_SPREAD:
+            factor += 0.5
+        extra = base * min(factor, self.max_factor - 1.0)
+
+        # nunca más de la mitad de lo que queda tras el tiempo base
+        return min(extra, max(0.0, (self.remaining - base) / 2))
+
+    def spend(self, elapsed):
+        if self.game_time is not None:
+            self.remaining -= elapsed
@@ -2,10 +2,14 @@ import numpy as np
 
 import sys
 import os
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing.util import Finalize
 sys.path.append(os.path.join(os.path.dirname(__file__), "extern_policies"))
 # ====== IMPORTA TUS POLÍTICAS AQUÍ ======
 from Policy_tournament import MyPolicy
 from RandomPolicy import RandomPolicy
+from seeding import generator, sequence
 #from random_policy import RandomPolicy    # ejemplo si tienes otra política
 # ========================================
 
@@ -97,14 +101,46 @@ def play_game(policy_red, policy_yellow):
 # ---------------------------------
 # TORNEO ENTRE DOS POLICIES
 # ---------------------------------
-def tournament(policyA_class, policyB_class, games=50):
+def _flush_policy(policy):
+    # vuelca lo aprendido tras cada partida (solo añade los deltas nuevos al
+    # diario del almacén), así una caída a mitad de torneo no lo pierde todo
+    if hasattr(policy, "flush"):
+        policy.flush()
+
+
+def game_seeds(seed, games):
+    """
+    Semilla de cada partida: el flujo (seed, i). Las versiones secuencial y
+    paralela de cada torneo usan las mismas. Solo juegan las mismas partidas
+    si las políticas no guardan estado entre partidas: MyPolicy aprende Q/N
+    y conserva la tabla del solver, y en paralelo cada proceso ha visto
+    otras partidas anteriores según el reparto.
+    """
+    root = sequence(seed)
+    return [sequence(root, i) for i in range(games)]
+
+
+def _seed_policy(policy, seed_seq):
+    if hasattr(policy, "seed"):
+        policy.seed(int(seed_seq.generate_state(1)[0]))
+
+
+def _seed_match(pA, pB, seed_seq):
+    # flujos independientes para cada política dentro de la partida
+    _seed_policy(pA, sequence(seed_seq, 0))
+    if pB is not None:
+        _seed_policy(pB, sequence(seed_seq, 1))
+
+
+def tournament(policyA_class, policyB_class, games=50, seed=None):
 
     results = {"A": 0, "B": 0, "draw": 0}
 
     pA = policyA_class()
     pB = policyB_class()
 
-    for i in range(games):
+    for i, seed_seq in enumerate(game_seeds(seed, games)):
+        _seed_match(pA, pB, seed_seq)
         if i % 2 == 0:
             # A como red
             res = play_game(pA, pB)
@@ -124,27 +160,23 @@ def tournament(policyA_class, policyB_class, games=50):
         else:
             results["draw"] += 1
 
+        _flush_policy(pA)
+        _flush_policy(pB)
 
     pA.finalize()
 
     return results
 
-def tournament_metrics_fast(policyA_class, policyB_class, games=30):
+def tournament_metrics_fast(policyA_class, policyB_class, games=30, seed=None):
 
     pA = policyA_class()
     pB = policyB_class()
 
-    wins = 0
-    losses = 0
-    draws = 0
-
     lengths = []
-    fast_wins = 0
-    mid_wins = 0
-    late_wins = 0
     sequence = []
 
-    for i in range(games):
+    for i, seed_seq in enumerate(game_seeds(seed, games)):
+        _seed_match(pA, pB, seed_seq)
 
         if i % 2 == 0:
             res, l = play_game_with_length(pA, pB)
@@ -156,22 +188,20 @@ def tournament_metrics_fast(policyA_class, policyB_class, games=30):
                 res = 1
 
         lengths.append(l)
+        sequence.append(res)
 
-        if l < 10:
-            fast_wins += 1
-        elif l < 20:
-            mid_wins += 1
-        else:
-            late_wins += 1
+    return summarize_metrics(sequence, lengths)
 
-        sequence.append(res)
 
-        if res == 1:
-            wins += 1
-        elif res == -1:
-            losses += 1
-        else:
-            draws += 1
+def summarize_metrics(sequence, lengths):
+    """Métricas de tournament_metrics_fast a partir de resultados y duraciones."""
+    games = len(sequence)
+    wins = sequence.count(1)
+    losses = sequence.count(-1)
+    draws = sequence.count(0)
+    fast_wins = sum(1 for l in lengths if l < 10)
+    mid_wins = sum(1 for l in lengths if 10 <= l < 20)
+    late_wins = sum(1 for l in lengths if l >= 20)
 
     dominance = (wins - losses) / games
     stability = np.var(sequence)
@@ -227,7 +257,7 @@ def play_game_with_length(policy_red, policy_yellow):
         player = -player
 
 
-def column_usage(policy_class, games=50):
+def column_usage(policy_class, games=50, seed=None):
     """
     Devuelve un array de tamaño 7 indicando
     cuántas veces la política jugó en cada columna.
@@ -235,49 +265,186 @@ def column_usage(policy_class, games=50):
     """
     col_usage = [0] * 7
 
-    for g in range(games):
-        board = np.zeros((6,7), dtype=int)
+    for seed_seq in game_seeds(seed, games):
         policy = policy_class()
-        policy.mount()
-        player = 1  # siempre medimos política como RED
+        _seed_policy(policy, sequence(seed_seq, 0))
+        rng = generator(seed_seq, 1)
+        for c, n in enumerate(column_usage_game(policy, rng)):
+            col_usage[c] += n
 
-        while True:
-            action = policy.act(board.copy())
+    return col_usage
 
-            # registrar columna usada por el agente
-            col_usage[action] += 1
 
-            # ejecutar jugada
-            for r in range(5, -1, -1):
-                if board[r, action] == 0:
-                    board[r, action] = player
-                    row = r
-                    break
+def column_usage_game(policy, rng):
+    """
+    Una partida de column_usage: `policy` como RED contra un rival que juega
+    al azar con `rng` (un np.random.Generator).
+    """
+    col_usage = [0] * 7
+    board = np.zeros((6,7), dtype=int)
+    policy.mount()
+    player = 1  # siempre medimos política como RED
 
-            # victoria / empate
-            if check_win(board, row, action, player):
-                break
-            if np.all(board[0] != 0):
-                break
+    while True:
+        action = policy.act(board.copy())
 
-            # el oponente hace jugada random
-            legal = [c for c in range(7) if board[0, c] == 0]
-            opp_action = np.random.choice(legal)
-            for r in range(5, -1, -1):
-                if board[r, opp_action] == 0:
-                    board[r, opp_action] = -player
-                    break
+        # registrar columna usada por el agente
+        col_usage[action] += 1
 
-            # victoria o empate del rival
-            if check_win(board, r, opp_action, -player):
+        # ejecutar jugada
+        for r in range(5, -1, -1):
+            if board[r, action] == 0:
+                board[r, action] = player
+                row = r
                 break
-            if np.all(board[0] != 0):
+
+        # victoria / empate
+        if check_win(board, row, action, player):
+            break
+        if np.all(board[0] != 0):
+            break
+
+        # el oponente hace jugada random
+        legal = [c for c in range(7) if board[0, c] == 0]
+        opp_action = rng.choice(legal)
+        for r in range(5, -1, -1):
+            if board[r, opp_action] == 0:
+                board[r, opp_action] = -player
                 break
 
+        # victoria o empate del rival
+        if check_win(board, r, opp_action, -player):
+            break
+        if np.all(board[0] != 0):
+            break
+
     return col_usage
 
 
 
+# ---------------------------------
+# TORNEO EN PARALELO
+# ---------------------------------
+_worker_policies = {}
+
+
+def _init_worker(policyA_class, policyB_class):
+    # cada proceso crea sus políticas una sola vez, no una por partida, y las
+    # cierra al apagarse el pool (vuelca Q/N, cierra sus procesos y libera
+    # la memoria compartida)
+    _worker_policies["A"] = policyA_class()
+    _worker_policies["B"] = policyB_class() if policyB_class is not None else None
+    Finalize(None, _finalize_worker, exitpriority=10)
+
+
+def _finalize_worker():
+    for policy in _worker_policies.values():
+        if hasattr(policy, "finalize"):
+            policy.finalize()
+    _worker_policies.clear()
+
+
+def _play_match(task):
+    i, seed_seq = task
+    pA = _worker_policies["A"]
+    pB = _worker_policies["B"]
+    _seed_match(pA, pB, seed_seq)
+
+    if i % 2 == 0:
+        res, l = play_game_with_length(pA, pB)
+    else:
+        res, l = play_game_with_length(pB, pA)
+        res = -res
+    _flush_policy(pA)
+    _flush_policy(pB)
+    return i, res, l
+
+
+def _play_column_usage(task):
+    i, seed_seq = task
+    policy = _worker_policies["A"]
+    _seed_policy(policy, sequence(seed_seq, 0))
+    return i, column_usage_game(policy, generator(seed_seq, 1))
+
+
+def iter_games_parallel(job, policyA_class, policyB_class, games,
+                        workers=None, seed=None):
+    """
+    Reparte `games` partidas entre `workers` procesos (por defecto uno por
+    núcleo) y devuelve los resultados de cada partida según van terminando,
+    como tuplas (índice, ...).
+
+    Cada partida recibe su propia semilla derivada de `seed` (se pasa a las
+    políticas que tengan un método seed()), así que con la misma semilla el
+    torneo se puede reproducir.
+
+    Los procesos no son daemon, así que las políticas pueden lanzar los
+    suyos (MyPolicy con workers > 1). Si un proceso no llega a crear sus
+    políticas el pool queda roto y se lanza BrokenProcessPool.
+    """
+    tasks = list(enumerate(game_seeds(seed, games)))
+
+    method = "fork" if "fork" in mp.get_all_start_methods() else "spawn"
+    ctx = mp.get_context(method)
+    with ProcessPoolExecutor(workers, mp_context=ctx,
+                             initializer=_init_worker,
+                             initargs=(policyA_class, policyB_class)) as pool:
+        futures = [pool.submit(job, task) for task in tasks]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def tournament_parallel(policyA_class, policyB_class, games=50,
+                        workers=None, seed=None, callback=None):
+    """
+    Igual que tournament(), repartiendo las partidas entre procesos.
+    `callback(i, res, length)` se llama con cada partida al terminar.
+    """
+    results = {"A": 0, "B": 0, "draw": 0}
+
+    for i, res, l in iter_games_parallel(_play_match, policyA_class,
+                                         policyB_class, games, workers, seed):
+        if callback is not None:
+            callback(i, res, l)
+
+        if res == 1:
+            results["A"] += 1
+        elif res == -1:
+            results["B"] += 1
+        else:
+            results["draw"] += 1
+
+    return results
+
+
+def tournament_metrics_parallel(policyA_class, policyB_class, games=30,
+                                workers=None, seed=None, callback=None):
+    """Igual que tournament_metrics_fast(), repartiendo las partidas entre procesos."""
+    sequence = [0] * games
+    lengths = [0] * games
+
+    for i, res, l in iter_games_parallel(_play_match, policyA_class,
+                                         policyB_class, games, workers, seed):
+        if callback is not None:
+            callback(i, res, l)
+        sequence[i] = res
+        lengths[i] = l
+
+    return summarize_metrics(sequence, lengths)
+
+
+def column_usage_parallel(policy_class, games=50, workers=None, seed=None):
+    """Igual que column_usage(), repartiendo las partidas entre procesos."""
+    col_usage = [0] * 7
+
+    for i, usage in iter_games_parallel(_play_column_usage, policy_class,
+                                        None, games, workers, seed):
+        for c, n in enumerate(usage):
+            col_usage[c] += n
+
+    return col_usage
+
+
 def run_tournament(policyA_class, policyB_class, games=50):
     """
     Función pensada para ser llamada desde Jupyter Notebook.
@@ -307,6 +474,5 @@ if __name__ == "__main__":
     print(f"Policy B ganó: {results['B']} veces")
     print(f"Empates: {results['draw']}")
 
-    saver = MyPolicy()
-    saver.finalize()
-    print("\n q_values.json guardado exitosamente")
\ No newline at end of file
+    # tournament() ya guardó lo aprendido en q_values/ al final de cada partida
+    print("\n q_values/ guardado exitosamente")
\ No newline at end of file
@@ -0,0 +1,196 @@
+import atexit
+import math
+import multiprocessing as mp
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from nodepool import NodePool
+from rollout import simulate_one
+from seeding import random_state, sequence
+
+
+VIRTUAL_LOSS = 1.0
+
+
+def search_tree(pool, lock, rng, root_board, deadline, c):
+    """
+    Iteraciones de MCTS sobre el árbol de `pool` hasta `deadline`; sirve
+    tanto para un único proceso como para varios sobre memoria compartida.
+
+    W[i] se guarda, como en el MCTS de MyPolicy, desde el punto de vista del
+    jugador al turno en i, así que cada padre elige el hijo con mayor -W/N.
+    Al bajar por un nodo se le suma una pérdida virtual para quien lo elige
+    (N += 1, W += 1) para que los demás procesos prefieran otros caminos; al
+    retropropagar se deshace.
+    Las actualizaciones de N/W no usan cerrojo (alguna se puede perder, como
+    en el MCTS paralelo sin bloqueo); solo la expansión lo usa.
+    """
+    N, W = pool.N, pool.W
+    iterations = 0
+
+    while time.monotonic() < deadline:
+        board = root_board.copy()
+        i = 0
+        path = [0]
+        N[0] += 1
+        W[0] += VIRTUAL_LOSS
+        winner = None
+
+        # ----- selección -----
+        while pool.untried[i] == 0 and pool.first_child[i] >= 0:
+            log_n = math.log(max(1, N[i]))
+            best, best_score = -1, -math.inf
+            for ch in pool.children(i):
+                n = N[ch]
+                score = (
+                    math.inf if n == 0
+                    else -W[ch] / n + c * math.sqrt(log_n / n)
+                )
+                if score > best_score:
+                    best, best_score = ch, score
+            board.play(int(pool.move[best]), int(pool.player[i]))
+            i = best
+            path.append(i)
+            N[i] += 1
+            W[i] += VIRTUAL_LOSS
+
+        to_move = int(pool.player[i])
+        if board.moves and board.has_won(-to_move):
+            winner = -to_move
+
+        # ----- expansión -----
+        if winner is None and pool.untried[i]:
+            child = -1
+            with lock:
+                actions = pool.untried_actions(i)
+                if actions:
+                    a = actions[rng.randint(len(actions))]
+                    board.play(a, to_move)
+                    won = board.has_won(to_move)
+                    child = pool.alloc(i, a, board, -to_move,
+                                       untried=0 if won else None)
+                    if child < 0:
+                        # pool lleno: la jugada sigue sin probar y se
+                        # simula desde i
+                        board.undo(a, to_move)
+                    else:
+                        pool.untried[i] &= ~np.uint8(1 << a)
+                        if won:
+                            winner = to_move
+                        to_move = -to_move
+            if child >= 0:
+                i = child
+                path.append(i)
+                N[i] += 1
+                W[i] += VIRTUAL_LOSS
+
+        # ----- simulación -----
+        if winner is None:
+            winner = simulate_one(board, to_move, rng)
+
+        # ----- retropropagación -----
+        for j in path:
+            to_move = int(pool.player[j])
+            reward = 1.0 if winner == to_move else -1.0 if winner != 0 else 0.0
+            W[j] += reward - VIRTUAL_LOSS
+
+        iterations += 1
+
+    return iterations
+
+
+def _worker(conn, shm_name, capacity, lock, seed, c):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    pool = NodePool(capacity, shm.buf)
+    rng = random_state(seed)
+
+    while True:
+        msg = conn.recv()
+        if msg is None:
+            break
+        time_limit = msg
+        deadline = time.monotonic() + time_limit
+        root_board = pool.board(0)
+        conn.send(search_tree(pool, lock, rng, root_board, deadline, c))
+
+    pool.release()
+    shm.close()
+    conn.close()
+
+
+class TreeParallelSearch:
+    """
+    MCTS paralelo sobre un único árbol: los nodos viven en un NodePool
+    respaldado por memoria compartida y `workers` procesos bajan a la vez
+    por el mismo árbol usando pérdida virtual. Frente a RootParallelSearch
+    concentra todo el esfuerzo en un solo árbol, lo que rinde más en
+    posiciones tácticas profundas.
+    """
+
+    def __init__(self, workers, capacity=200_000, seed=None, c=1.3):
+        method = "fork" if "fork" in mp.get_all_start_methods() else "spawn"
+        ctx = mp.get_context(method)
+
+        self.capacity = capacity
+        self.shm = shared_memory.SharedMemory(
+            create=True, size=NodePool.nbytes(capacity)
+        )
+        self.pool = NodePool(capacity, self.shm.buf)
+        self.lock = ctx.Lock()
+
+        self.conns = []
+        self.procs = []
+        for w in range(workers):
+            parent_conn, child_conn = ctx.Pipe()
+            proc = ctx.Process(
+                target=_worker,
+                args=(child_conn, self.shm.name, capacity, self.lock,
+                      sequence(seed, w), c),
+                daemon=True
+            )
+            proc.start()
+            child_conn.close()
+            self.conns.append(parent_conn)
+            self.procs.append(proc)
+
+        # el bloque compartido no se libera solo al salir del intérprete
+        atexit.register(self.close)
+
+    def search(self, board, player, time_limit=0.05):
+        """
+        return: dict acción -> [N, W] de los hijos de la raíz, con W para el
+        jugador al turno en el hijo (como root_stats() de MyPolicy).
+        """
+        self.pool.reset(board, player)
+        for conn in self.conns:
+            conn.send(time_limit)
+        self.iterations = sum(conn.recv() for conn in self.conns)
+
+        pool = self.pool
+        return {
+            int(pool.move[ch]): [int(pool.N[ch]), float(pool.W[ch])]
+            for ch in pool.children(0)
+        }
+
+    def close(self):
+        for conn in self.conns:
+            try:
+                conn.send(None)
+                conn.close()
+            except OSError:
+                pass
+        for proc in self.procs:
+            proc.join(timeout=1)
+            if proc.is_alive():
+                proc.terminate()
+        self.conns = []
+        self.procs = []
+
+        if self.shm is not None:
+            self.pool.release()
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+            atexit.unregister(self.close)